@@ -0,0 +1,44 @@
+"""Memory held by an open document: plain JSON dicts versus CompactDocument.
+
+    python -m benchmarks.bench_memory --pages 2000 --documents 3
+"""
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+
+from benchmarks.bench_serialization import make_document
+from data.compact_document import CompactDocument
+
+
+def measure(build, texts):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    documents = [build(text) for text in texts]
+    seconds = time.perf_counter() - start
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return documents, {'seconds': round(seconds, 3), 'resident_mb': round(current / 1e6, 2)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the memory of open documents.")
+    parser.add_argument("--pages", type=int, default=1000)
+    parser.add_argument("--detections", type=int, default=12, help="detections per page")
+    parser.add_argument("--documents", type=int, default=1, help="documents held at once")
+    args = parser.parse_args(argv)
+
+    texts = [json.dumps(make_document(args.pages, args.detections, seed=seed)) for seed in range(args.documents)]
+    results = {}
+    for name, build in (('dicts', json.loads), ('compact', lambda text: CompactDocument(json.loads(text)))):
+        documents, results[name] = measure(build, texts)
+        del documents
+        print(f"{name:8} {results[name]['resident_mb']:9.2f} MB  load {results[name]['seconds']:.3f} s")
+    return results
+
+
+if __name__ == '__main__':
+    main()
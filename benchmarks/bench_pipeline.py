@@ -0,0 +1,117 @@
+"""Throughput of OCRPipeline on synthetic PDFs with stub engines.
+
+No models are needed, so this runs offline on any CPU-only machine:
+
+    python -m benchmarks.bench_pipeline --pages 40 --output pipeline_results.json
+
+Each scenario runs in a fresh process so its peak RSS is its own.
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+SCENARIOS = {
+    'scanned': {'scanned': True, 'use_captioning': False, 'use_text_layer': True},
+    'scanned-captioning': {'scanned': True, 'use_captioning': True, 'use_text_layer': True},
+    'born-digital': {'scanned': False, 'use_captioning': False, 'use_text_layer': True},
+    'born-digital-ocr': {'scanned': False, 'use_captioning': False, 'use_text_layer': False},
+}
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS.
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def run_scenario(name, options):
+    from benchmarks.stub_engines import StubCaptioningModel, StubLayoutDetector, StubRecognizer
+    from benchmarks.synthetic_pdf import make_pdf
+    from data.core.parsing_utils.pipeline import OCRPipeline
+
+    # layout_detection configures DEBUG logging on import; per-page logs would skew the timings.
+    logging.getLogger().setLevel(logging.WARNING)
+    scenario = SCENARIOS[name]
+    with tempfile.TemporaryDirectory() as work_dir:
+        pdf_path = make_pdf(os.path.join(work_dir, f"{name}.pdf"), pages=options['pages'], scanned=scenario['scanned'])
+        pipeline = OCRPipeline(
+            StubRecognizer(crop_latency=options['ocr_latency'], megapixel_latency=options['ocr_megapixel_latency']),
+            use_captioning=scenario['use_captioning'],
+            use_text_layer=scenario['use_text_layer'],
+            batch_pages=options['batch_pages'],
+            layout_batch_size=options['layout_batch_size'],
+            ocr_dpi=options['ocr_dpi'],
+            layout_detector=StubLayoutDetector(page_latency=options['layout_latency']),
+            captioning_model=StubCaptioningModel(image_latency=options['caption_latency']),
+        )
+        start = time.perf_counter()
+        stats = pipeline.run(pdf_path, os.path.join(work_dir, f"{name}.json"))
+        wall = time.perf_counter() - start
+
+    return {
+        'scenario': name,
+        'pages': options['pages'],
+        'wall_seconds': round(wall, 3),
+        'pages_per_second': round(options['pages'] / wall, 2),
+        'peak_rss_mb': peak_rss_mb(),
+        'stages': stats.report()['stages'],
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the OCR pipeline with stub engines.")
+    parser.add_argument("--scenario", choices=list(SCENARIOS), action="append", help="default: all scenarios")
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--layout-latency", type=float, default=0.05, help="stub layout seconds per page")
+    parser.add_argument("--ocr-latency", type=float, default=0.01, help="stub OCR seconds per crop")
+    parser.add_argument("--ocr-megapixel-latency", type=float, default=0.05, help="stub OCR seconds per megapixel")
+    parser.add_argument("--caption-latency", type=float, default=0.05, help="stub captioning seconds per picture")
+    parser.add_argument("--batch-pages", type=int, default=1)
+    parser.add_argument("--layout-batch-size", type=int, default=4)
+    parser.add_argument("--ocr-dpi", type=int, default=300)
+    parser.add_argument("--output", default=None, help="also write the results to this JSON file")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    options = {
+        'pages': args.pages,
+        'layout_latency': args.layout_latency,
+        'ocr_latency': args.ocr_latency,
+        'ocr_megapixel_latency': args.ocr_megapixel_latency,
+        'caption_latency': args.caption_latency,
+        'batch_pages': args.batch_pages,
+        'layout_batch_size': args.layout_batch_size,
+        'ocr_dpi': args.ocr_dpi,
+    }
+
+    results = []
+    context = multiprocessing.get_context("spawn")
+    for name in args.scenario or list(SCENARIOS):
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            result = executor.submit(run_scenario, name, options).result()
+        results.append(result)
+        slowest = sorted(result['stages'].items(), key=lambda item: item[1]['seconds'], reverse=True)[:3]
+        stages = ", ".join(f"{stage} {entry['seconds']:.2f} s" for stage, entry in slowest)
+        print(f"{name:20} {result['pages_per_second']:7.2f} pages/s  {result['wall_seconds']:7.2f} s  "
+              f"peak RSS {result['peak_rss_mb']} MB  [{stages}]")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'options': options, 'results': results}, f, indent=4)
+    return results
+
+
+if __name__ == '__main__':
+    main()
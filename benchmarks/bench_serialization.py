@@ -0,0 +1,81 @@
+"""Time and peak memory of writing the document JSON.
+
+Compares the full-document `json.dump(indent=4)` used by DataManager.save_data
+with the page-by-page StreamingJSONWriter used by the pipeline:
+
+    python -m benchmarks.bench_serialization --pages 2000
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.synthetic_pdf import WORDS
+from data.core.parsing_utils.json_writer import StreamingJSONWriter
+
+
+def make_document(pages=500, detections=12, seed=0):
+    rng = random.Random(seed)
+    document = {'metadata': {'title': "Synthetic benchmark document"}, 'pages': []}
+    for page_number in range(1, pages + 1):
+        page_detections = []
+        for index in range(detections):
+            page_detections.append({
+                'class': 'Section-header' if index == 0 else 'Text',
+                'bbox': [72, 40 + index * 60, 523, 90 + index * 60],
+                'text': " ".join(rng.choice(WORDS) for _ in range(80)),
+            })
+        document['pages'].append({'page': page_number, 'detections': page_detections})
+    return document
+
+
+def write_json_dump(document, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(document, f, indent=4, ensure_ascii=False)
+
+
+def write_streaming(document, path):
+    with StreamingJSONWriter(path, metadata=document['metadata']) as writer:
+        for page_data in document['pages']:
+            writer.write_page(page_data)
+
+
+def measure(function, document, path):
+    start = time.perf_counter()
+    function(document, path)
+    seconds = time.perf_counter() - start
+
+    # Memory is traced in a second run; tracing slows the code down too much to time it.
+    tracemalloc.start()
+    function(document, path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'seconds': round(seconds, 3), 'peak_mb': round(peak / 1e6, 2), 'size_mb': round(os.path.getsize(path) / 1e6, 2)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark writing the document JSON.")
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--detections", type=int, default=12, help="detections per page")
+    args = parser.parse_args(argv)
+
+    document = make_document(args.pages, args.detections)
+    results = {}
+    with tempfile.TemporaryDirectory() as work_dir:
+        paths = {}
+        for name, function in (('json.dump', write_json_dump), ('streaming', write_streaming)):
+            paths[name] = os.path.join(work_dir, f"{name}.json")
+            results[name] = measure(function, document, paths[name])
+            print(f"{name:10} {results[name]['seconds']:7.3f} s  peak {results[name]['peak_mb']:8.2f} MB  "
+                  f"file {results[name]['size_mb']:.2f} MB")
+        with open(paths['json.dump'], 'rb') as a, open(paths['streaming'], 'rb') as b:
+            identical = a.read() == b.read()
+    print(f"Outputs identical: {identical}")
+    return results
+
+
+if __name__ == '__main__':
+    main()
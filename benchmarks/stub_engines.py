@@ -0,0 +1,80 @@
+import time
+
+import numpy as np
+import supervision as sv
+
+from data.core.parsing_utils.pipeline import Recognizer
+
+CLASS_NAMES = {0: 'Page-header', 1: 'Section-header', 2: 'Text', 3: 'Picture', 4: 'Page-footer'}
+
+# Region layout of benchmarks/synthetic_pdf.py pages, as fractions of the page.
+PAGE_REGIONS = [
+    (0, (0.12, 0.03, 0.6, 0.06)),
+    (1, (0.12, 0.08, 0.5, 0.12)),
+    (2, (0.12, 0.14, 0.88, 0.30)),
+    (2, (0.12, 0.31, 0.88, 0.47)),
+    (2, (0.12, 0.48, 0.88, 0.64)),
+    (3, (0.12, 0.65, 0.53, 0.84)),
+    (4, (0.45, 0.95, 0.55, 0.98)),
+]
+
+
+class StubLayoutDetector:
+    """Deterministic stand-in for the YOLO layout model.
+
+    Every page gets the same regions; a batched call sleeps
+    `call_latency + page_latency * len(images)` seconds.
+    """
+
+    def __init__(self, page_latency=0.05, call_latency=0.0):
+        self.page_latency = page_latency
+        self.call_latency = call_latency
+        self.class_names = CLASS_NAMES
+
+    def detect_layout(self, image):
+        return self.detect_layout_batch([image])[0]
+
+    def detect_layout_batch(self, images):
+        time.sleep(self.call_latency + self.page_latency * len(images))
+        detections = []
+        for image in images:
+            height, width = image.shape[:2]
+            scale = np.array([width, height, width, height], dtype=np.float32)
+            xyxy = np.array([box for _, box in PAGE_REGIONS], dtype=np.float32) * scale
+            detections.append(sv.Detections(
+                xyxy=xyxy,
+                class_id=np.array([class_id for class_id, _ in PAGE_REGIONS]),
+                confidence=np.ones(len(PAGE_REGIONS), dtype=np.float32),
+            ))
+        return detections
+
+    def get_class_name(self, class_id):
+        return self.class_names.get(int(class_id), "Unknown")
+
+
+class StubRecognizer(Recognizer):
+    """OCR stand-in sleeping `crop_latency` per crop plus `megapixel_latency` per megapixel."""
+    name = "stub"
+    version = "1"
+    language = "none"
+
+    def __init__(self, crop_latency=0.01, megapixel_latency=0.05):
+        self.crop_latency = crop_latency
+        self.megapixel_latency = megapixel_latency
+
+    def recognize(self, cropped_image, class_name):
+        height, width = cropped_image.shape[:2]
+        time.sleep(self.crop_latency + self.megapixel_latency * height * width / 1e6)
+        return f"{class_name} {width}x{height}"
+
+
+class StubCaptioningModel:
+    def __init__(self, image_latency=0.05):
+        self.image_latency = image_latency
+
+    def caption(self, image):
+        return self.caption_batch([image])[0]
+
+    def caption_batch(self, images):
+        time.sleep(self.image_latency * len(images))
+        return [f"picture {image.width}x{image.height}" for image in images]
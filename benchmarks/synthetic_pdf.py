@@ -0,0 +1,57 @@
+import random
+
+import fitz
+import numpy as np
+
+WORDS = (
+    "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor incididunt ut labore "
+    "et dolore magna aliqua enim ad minim veniam quis nostrud exercitation ullamco laboris nisi aliquip"
+).split()
+
+
+def _paragraph(rng, words=60):
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def _picture_png(rng, width=240, height=160):
+    pixels = np.zeros((height, width, 3), dtype=np.uint8)
+    pixels[:, :, 0] = np.linspace(0, 255, width, dtype=np.uint8)[None, :]
+    pixels[:, :, 1] = np.linspace(0, 255, height, dtype=np.uint8)[:, None]
+    pixels[:, :, 2] = rng.randrange(256)
+    pixmap = fitz.Pixmap(fitz.csRGB, width, height, pixels.tobytes(), False)
+    return pixmap.tobytes("png")
+
+
+def make_pdf(path, pages=20, scanned=False, pictures=True, seed=0, scan_dpi=150):
+    """Writes a book-like PDF: header, chapter title, paragraphs, a picture and a page number.
+
+    With `scanned` every page is flattened into an image at `scan_dpi`, so
+    the PDF has no text layer and goes through layout detection and OCR.
+    The same `seed` always produces the same document.
+    """
+    rng = random.Random(seed)
+    doc = fitz.open()
+    for page_number in range(1, pages + 1):
+        page = doc.new_page(width=595, height=842)
+        page.insert_text((72, 40), "Synthetic benchmark document", fontsize=8)
+        page.insert_text((72, 90), f"Chapter {page_number}", fontsize=20)
+        y = 120
+        for _ in range(3):
+            rect = fitz.Rect(72, y, 523, y + 130)
+            page.insert_textbox(rect, _paragraph(rng), fontsize=10)
+            y += 140
+        if pictures:
+            page.insert_image(fitz.Rect(72, y, 312, y + 160), stream=_picture_png(rng))
+        page.insert_text((290, 810), str(page_number), fontsize=9)
+
+    if scanned:
+        flattened = fitz.open()
+        for page in doc:
+            image = flattened.new_page(width=page.rect.width, height=page.rect.height)
+            image.insert_image(image.rect, pixmap=page.get_pixmap(dpi=scan_dpi))
+        doc.close()
+        doc = flattened
+
+    doc.save(path)
+    doc.close()
+    return path
@@ -0,0 +1,210 @@
+import argparse
+import glob
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from data.core.parsing_utils.engines import ENGINES
+
+_pipeline = None
+
+
+def collect_pdfs(inputs):
+    """(pdf_path, relative_path) pairs; relative_path is the PDF's path below its input directory, or its file name."""
+    pdfs = []
+    for path in inputs:
+        if os.path.isdir(path):
+            for pdf_path in sorted(glob.glob(os.path.join(path, "**", "*.pdf"), recursive=True)):
+                pdfs.append((pdf_path, os.path.relpath(pdf_path, path)))
+        elif path.lower().endswith(".pdf"):
+            pdfs.append((path, os.path.basename(path)))
+        else:
+            # Manifest: one PDF path per line, relative paths resolved against the manifest.
+            base_dir = os.path.dirname(os.path.abspath(path))
+            with open(path, 'r', encoding='utf-8') as manifest:
+                for line in manifest:
+                    line = line.strip()
+                    if line and not line.startswith("#"):
+                        pdfs.append((os.path.join(base_dir, line), os.path.basename(line)))
+    return pdfs
+
+
+def get_json_path(pdf_path, output_dir=None, relative_path=None):
+    # Under output_dir the input directory layout is mirrored, so vol1/book.pdf and vol2/book.pdf stay apart.
+    if output_dir is None:
+        return os.path.splitext(pdf_path)[0] + ".json"
+    return os.path.join(output_dir, os.path.splitext(relative_path or os.path.basename(pdf_path))[0] + ".json")
+
+
+def plan_jobs(pdfs, output_dir=None):
+    """(pdf_path, output_json) for each PDF, and {output_json: [pdf_path, ...]} for outputs claimed more than once."""
+    jobs = [(pdf_path, get_json_path(pdf_path, output_dir, relative_path)) for pdf_path, relative_path in pdfs]
+    claimed = {}
+    for pdf_path, output_json in jobs:
+        claimed.setdefault(os.path.normcase(os.path.abspath(output_json)), []).append(pdf_path)
+    return jobs, {output_json: pdf_paths for output_json, pdf_paths in claimed.items() if len(pdf_paths) > 1}
+
+
+def init_worker(options):
+    # Runs once per worker process; the models then stay loaded for every file it converts.
+    global _pipeline
+    from data.core.parsing_utils.engines import create_recognizer
+    from data.core.parsing_utils.ocr_cache import OCRCache
+    from data.core.parsing_utils.pipeline import FURNITURE_CLASSES, OCRPipeline
+
+    recognizer = create_recognizer(options['engine'], options['language'], **options['recognizer_options'])
+    _pipeline = OCRPipeline(
+        recognizer,
+        use_captioning=options['use_captioning'],
+        cache=OCRCache() if options['use_cache'] else None,
+        use_text_layer=options['use_text_layer'],
+        ocr_dpi=options['ocr_dpi'],
+        furniture_classes=FURNITURE_CLASSES if options['furniture'] else (),
+        skip_classes=options['skip_classes'],
+    )
+
+
+def convert_file(pdf_path, output_json, resume, reprocess=None):
+    start_time = time.perf_counter()
+    result = {'pdf': pdf_path, 'json': output_json}
+    try:
+        if reprocess and os.path.exists(output_json):
+            from data.core.parsing_utils.reprocess import reprocess_pdf
+            result.update(reprocess_pdf(_pipeline, pdf_path, output_json, **reprocess))
+        else:
+            stats = _pipeline.run(pdf_path, output_json, resume=resume)
+            result['pages_per_second'] = stats.report()['pages_per_second']
+        result['status'] = 'ok'
+    except Exception as e:
+        logging.error(f"Conversion of {pdf_path} failed: {e}")
+        result['status'] = 'failed'
+        result['error'] = f"{type(e).__name__}: {e}"
+    result['seconds'] = round(time.perf_counter() - start_time, 3)
+    return result
+
+
+def convert_all(jobs, options, workers=1, resume=False, reprocess=None):
+    results = []
+
+    if workers <= 1:
+        init_worker(options)
+        for pdf_path, output_json in jobs:
+            results.append(convert_file(pdf_path, output_json, resume, reprocess))
+            logging.info(f"[{len(results)}/{len(jobs)}] {pdf_path}: {results[-1]['status']} in {results[-1]['seconds']} s")
+        return results
+
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=init_worker, initargs=(options,)) as executor:
+        futures = {executor.submit(convert_file, pdf_path, output_json, resume, reprocess): pdf_path for pdf_path, output_json in jobs}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                # The worker process itself died (e.g. model load failure or OOM kill).
+                result = {'pdf': futures[future], 'status': 'failed', 'error': f"{type(e).__name__}: {e}", 'seconds': None}
+            results.append(result)
+            logging.info(f"[{len(results)}/{len(jobs)}] {result['pdf']}: {result['status']} in {result['seconds']} s")
+    return results
+
+
+def write_summary(results, summary_path, wall_time):
+    failed = [result for result in results if result['status'] != 'ok']
+    summary = {
+        'files': len(results),
+        'succeeded': len(results) - len(failed),
+        'failed': len(failed),
+        'wall_seconds': round(wall_time, 3),
+        'results': sorted(results, key=lambda result: result['pdf']),
+    }
+    with open(summary_path, 'w', encoding='utf-8') as summary_file:
+        json.dump(summary, summary_file, indent=4, ensure_ascii=False)
+    return summary
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Convert PDFs to PDF Curator JSON without the GUI.")
+    parser.add_argument("inputs", nargs="+", help="PDF files, directories of PDFs, or manifest files listing PDF paths")
+    parser.add_argument("--engine", choices=list(ENGINES), default="Tesseract")
+    parser.add_argument("--language", default=None, help="OCR language code (Tesseract and PaddleOCR)")
+    parser.add_argument("--captioning", action="store_true", help="caption Picture regions")
+    parser.add_argument("--workers", type=int, default=1, help="number of files converted in parallel")
+    parser.add_argument("--output-dir", default=None, help="write JSON files here instead of next to each PDF")
+    parser.add_argument("--summary", default="conversion_summary.json", help="path of the run summary")
+    parser.add_argument("--resume", action="store_true", help="continue interrupted conversions from their checkpoints")
+    parser.add_argument("--no-cache", action="store_true", help="do not use the persistent OCR cache")
+    parser.add_argument("--no-text-layer", action="store_true", help="OCR every page even if the PDF has a text layer")
+    parser.add_argument("--ocr-dpi", type=int, default=300)
+    parser.add_argument("--furniture", action="store_true", help="read page headers and footers, each distinct one only once")
+    parser.add_argument("--skip-class", action="append", default=[], metavar="CLASS", help="never OCR regions of this layout class (may be repeated)")
+    parser.add_argument("--page-mode", action="store_true", help="Tesseract: read each page in one run and assign the words to the detected regions")
+    parser.add_argument("--pages", default=None, help="only re-process these pages of existing JSON files, e.g. 1-3,7")
+    parser.add_argument("--changed", action="store_true", help="only re-process pages whose PDF content changed since the JSON was made")
+    parser.add_argument("--overwrite-edits", action="store_true", help="also re-process pages that were edited in the GUI")
+    parser.add_argument("--server", default=None, help="URL of a running inference server (python run_server.py) to use instead of loading models")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    args = parse_args(argv)
+
+    pdfs = collect_pdfs(args.inputs)
+    if not pdfs:
+        logging.error("No PDF files found.")
+        return 1
+    jobs, duplicates = plan_jobs(pdfs, args.output_dir)
+    if duplicates:
+        # Parallel conversions into one JSON would share its temporary and checkpoint files.
+        for output_json, pdf_paths in duplicates.items():
+            logging.error(f"{output_json} would be written by several PDFs: {', '.join(pdf_paths)}")
+        return 1
+    for output_dir in sorted({os.path.dirname(output_json) for _, output_json in jobs}):
+        os.makedirs(output_dir or ".", exist_ok=True)
+    if args.server:
+        # Read by the recognizer registry and layout_detection; spawned workers inherit it.
+        os.environ["PDFCURATOR_SERVER"] = args.server
+
+    recognizer_options = {}
+    if args.page_mode:
+        if args.engine != "Tesseract":
+            logging.error("--page-mode is only available for Tesseract.")
+            return 1
+        if os.environ.get("PDFCURATOR_SERVER"):
+            logging.error("--page-mode is not available with the inference server.")
+            return 1
+        recognizer_options['page_mode'] = True
+
+    options = {
+        'engine': args.engine,
+        'recognizer_options': recognizer_options,
+        'language': args.language,
+        'use_captioning': args.captioning,
+        'use_cache': not args.no_cache,
+        'use_text_layer': not args.no_text_layer,
+        'ocr_dpi': args.ocr_dpi,
+        'furniture': args.furniture,
+        'skip_classes': args.skip_class,
+    }
+
+    reprocess = None
+    if args.pages or args.changed:
+        from data.core.parsing_utils.reprocess import parse_page_range
+        reprocess = {
+            'pages': parse_page_range(args.pages) if args.pages else None,
+            'changed_only': args.changed,
+            'force': args.overwrite_edits,
+        }
+
+    start_time = time.perf_counter()
+    results = convert_all(jobs, options, workers=args.workers, resume=args.resume, reprocess=reprocess)
+    summary = write_summary(results, args.summary, time.perf_counter() - start_time)
+    logging.info(f"Converted {summary['succeeded']} of {summary['files']} files, summary written to {args.summary}")
+    return 1 if summary['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
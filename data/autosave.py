@@ -0,0 +1,106 @@
+import json
+import queue
+import threading
+import time
+
+from data.edit_journal import write_text_atomic
+
+
+class AutoSaver:
+    """Saves a DocumentModel on a worker thread so the GUI never waits for the disk.
+
+    `record` is subscribed to the model and only serializes the patch. Once
+    edits have stopped for `delay` seconds the worker appends them to the
+    journal; after `compact_every` journaled edits, or on `close`, it rewrites
+    the JSON atomically from a snapshot taken under the model's lock.
+    Outcomes are put on `results` as ('saved', message) or ('error', message)
+    for the GUI to poll with `after()`.
+    """
+
+    def __init__(self, document, journal, json_path, delay=0.5, compact_every=200):
+        self.document = document
+        self.journal = journal
+        self.json_path = json_path
+        self.delay = delay
+        self.compact_every = compact_every
+        self.results = queue.Queue()
+        self._pending = []
+        self._last_edit = 0.0
+        self._compact_requested = False
+        self._closing = False
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="autosave", daemon=True)
+        self._thread.start()
+
+    def record(self, patch):
+        line = json.dumps(patch, ensure_ascii=False)
+        with self._condition:
+            self._pending.append(line)
+            self._last_edit = time.monotonic()
+            self._condition.notify()
+
+    def request(self, compact=False):
+        with self._condition:
+            self._compact_requested = self._compact_requested or compact
+            self._condition.notify()
+
+    def close(self, timeout=None):
+        """Writes everything out, compacting the JSON if anything was journaled, and stops the worker."""
+        with self._condition:
+            self._closing = True
+            self._condition.notify()
+        self._thread.join(timeout)
+
+    def _take_pending(self):
+        with self._condition:
+            lines, self._pending = self._pending, []
+        return lines
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not (self._closing or self._pending or self._compact_requested):
+                    self._condition.wait()
+                # Debounce: a burst of edits is written once, after it ends.
+                while not self._closing and self._pending:
+                    remaining = self._last_edit + self.delay - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                closing = self._closing
+                compact = self._compact_requested
+                self._compact_requested = False
+
+            lines = self._take_pending()
+            journaled = False
+            try:
+                if lines:
+                    self.journal.write(lines)
+                journaled = True
+                if compact or self.journal.count >= self.compact_every or (closing and self.journal.count):
+                    self._compact()
+                elif lines:
+                    self.results.put(('saved', f"Saved {len(lines)} edits"))
+            except Exception as e:
+                if not journaled:
+                    # Nothing reached the journal; keep the edits for the next attempt.
+                    with self._condition:
+                        self._pending[:0] = lines
+                self.results.put(('error', f"Failed to save {self.json_path}: {e}"))
+                if closing:
+                    return
+            if closing:
+                return
+
+    def _compact(self):
+        start = time.perf_counter()
+        with self.document.lock:
+            text = json.dumps(self.document.data, indent=4, ensure_ascii=False)
+            # Edits recorded up to here are in the snapshot; they still go to the
+            # journal first in case writing the JSON fails.
+            lines = self._take_pending()
+        if lines:
+            self.journal.write(lines)
+        write_text_atomic(self.json_path, text)
+        self.journal.clear()
+        self.results.put(('saved', f"Saved {self.json_path} in {time.perf_counter() - start:.2f} s"))
@@ -0,0 +1,228 @@
+"""Compact in-memory form of a document for batch export and analytics.
+
+A DocumentModel keeps every detection as a dict with its own string keys and
+a list of Python numbers for the bbox, which costs several hundred bytes per
+detection. Here each page keeps its bboxes, class ids and detection ids in
+NumPy arrays, class names are stored once in a table shared by all documents,
+and the rest of a detection lives in a slotted record. `to_dict` gives back
+exactly the JSON that was loaded.
+
+The read-only lookups match DocumentModel, so the exporters can run on a
+CompactDocument; the dicts they get are built on the fly and edits to them are
+not kept.
+"""
+import json
+import sys
+
+import numpy as np
+
+from data.edit_journal import write_json_atomic
+
+# Class names by class id, shared by every CompactDocument in the process.
+CLASS_NAMES = []
+_CLASS_IDS = {}
+
+# Key orders of detections, interned so that detections with the same keys share one tuple.
+_KEY_ORDERS = {}
+
+
+def class_id(name):
+    if name not in _CLASS_IDS:
+        _CLASS_IDS[name] = len(CLASS_NAMES)
+        CLASS_NAMES.append(sys.intern(name))
+    return _CLASS_IDS[name]
+
+
+def _key_order(keys):
+    keys = tuple(sys.intern(key) for key in keys)
+    return _KEY_ORDERS.setdefault(keys, keys)
+
+
+def _is_number(value):
+    # Integers beyond 2**53 would not survive the float64 array.
+    return isinstance(value, float) or (isinstance(value, int) and not isinstance(value, bool) and abs(value) < 2 ** 53)
+
+
+class DetectionRecord:
+    __slots__ = ('keys', 'text', 'extra')
+
+    def __init__(self, keys, text, extra):
+        self.keys = keys
+        self.text = text
+        # Fields that have no column, or whose value does not fit it; None if there are none.
+        self.extra = extra
+
+
+class CompactPage:
+    __slots__ = ('page', 'index', 'fields', 'bboxes', 'int_bboxes', 'class_ids', 'ids', 'records')
+
+    def __init__(self, page_data, index):
+        self.page = page_data['page']
+        self.index = index
+        # Page-level fields in their original order; 'detections' is only a placeholder.
+        self.fields = {key: (None if key == 'detections' else value) for key, value in page_data.items()}
+        detections = page_data.get('detections', [])
+        count = len(detections)
+        self.bboxes = np.zeros((count, 4), dtype=np.float64)
+        self.int_bboxes = np.zeros(count, dtype=bool)
+        self.class_ids = np.full(count, -1, dtype=np.int16)
+        # Rows without an integer id get their row number, as DocumentModel gives them.
+        self.ids = np.arange(count, dtype=np.int64)
+        self.records = []
+        for row, detection in enumerate(detections):
+            extra = {}
+            for key, value in detection.items():
+                if key == 'class' and isinstance(value, str):
+                    self.class_ids[row] = class_id(value)
+                elif key == 'bbox' and isinstance(value, list) and len(value) == 4 and all(_is_number(v) for v in value):
+                    self.bboxes[row] = value
+                    self.int_bboxes[row] = all(isinstance(v, int) for v in value)
+                    if not self.int_bboxes[row] and any(isinstance(v, int) for v in value):
+                        # Mixed ints and floats would not come back as written.
+                        extra[key] = value
+                elif key == 'id' and isinstance(value, int) and not isinstance(value, bool) and abs(value) < 2 ** 63:
+                    self.ids[row] = value
+                elif key == 'text' and isinstance(value, str):
+                    pass
+                else:
+                    extra[key] = value
+            text = detection.get('text') if isinstance(detection.get('text'), str) else None
+            self.records.append(DetectionRecord(_key_order(detection), text, extra or None))
+
+    def __len__(self):
+        return len(self.records)
+
+    @property
+    def ignore(self):
+        return bool(self.fields.get('ignore', False))
+
+    def class_name(self, row):
+        class_index = self.class_ids[row]
+        return CLASS_NAMES[class_index] if class_index >= 0 else None
+
+    def rows_of_class(self, name):
+        if name not in _CLASS_IDS:
+            return np.zeros(0, dtype=np.intp)
+        return np.flatnonzero(self.class_ids == _CLASS_IDS[name])
+
+    def detection(self, row, with_id=False):
+        record = self.records[row]
+        extra = record.extra or {}
+        detection = {}
+        for key in record.keys:
+            if key in extra:
+                detection[key] = extra[key]
+            elif key == 'class':
+                detection[key] = CLASS_NAMES[self.class_ids[row]]
+            elif key == 'bbox':
+                bbox = self.bboxes[row]
+                detection[key] = bbox.astype(np.int64).tolist() if self.int_bboxes[row] else bbox.tolist()
+            elif key == 'id':
+                detection[key] = int(self.ids[row])
+            elif key == 'text':
+                detection[key] = record.text
+        if with_id and 'id' not in detection:
+            detection['id'] = int(self.ids[row])
+        return detection
+
+    def detections(self):
+        return [self.detection(row) for row in range(len(self.records))]
+
+    def stub(self):
+        """The page fields the exporters and listings use, without the detections."""
+        return {'page': self.page, 'index': self.index, 'ignore': self.ignore}
+
+    def to_dict(self):
+        page_data = dict(self.fields)
+        if 'detections' in page_data or self.records:
+            page_data['detections'] = self.detections()
+        return page_data
+
+
+class CompactDocument:
+    def __init__(self, data):
+        # Top-level fields in their original order; 'pages' is only a placeholder.
+        self.fields = {key: (None if key == 'pages' else value) for key, value in data.items()}
+        self._pages = [CompactPage(page_data, index) for index, page_data in enumerate(data.get('pages', []))]
+        self._positions = {page.page: page.index for page in self._pages}
+
+    @classmethod
+    def load(cls, json_path):
+        with open(json_path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def to_dict(self):
+        data = dict(self.fields)
+        if 'pages' in data or self._pages:
+            data['pages'] = [page.to_dict() for page in self._pages]
+        return data
+
+    def save(self, json_path):
+        write_json_atomic(json_path, self.to_dict())
+
+    # Analytics
+
+    def compact_pages(self):
+        return self._pages
+
+    def detection_count(self):
+        return sum(len(page) for page in self._pages)
+
+    def class_counts(self):
+        counts = np.zeros(len(CLASS_NAMES), dtype=np.int64)
+        for page in self._pages:
+            counts += np.bincount(page.class_ids[page.class_ids >= 0], minlength=len(CLASS_NAMES))
+        return {CLASS_NAMES[index]: int(count) for index, count in enumerate(counts) if count}
+
+    # DocumentModel lookups
+
+    def metadata(self):
+        return self.fields.get('metadata') or {}
+
+    def page_count(self):
+        return len(self._pages)
+
+    def page_at(self, position):
+        return self._pages[position].to_dict()
+
+    def page(self, page_number):
+        position = self._positions.get(page_number)
+        return None if position is None else self._pages[position].to_dict()
+
+    def pages(self):
+        for page in self._pages:
+            yield page.to_dict()
+
+    def _of_class(self, name, include_ignored=True):
+        for page in self._pages:
+            if not include_ignored and page.ignore:
+                continue
+            rows = page.rows_of_class(name)
+            if len(rows):
+                stub = page.stub()
+                for row in rows:
+                    yield stub, page.detection(row, with_id=True)
+
+    def pictures(self):
+        return list(self._of_class('Picture'))
+
+    def section_headers(self, include_ignored=True):
+        return list(self._of_class('Section-header', include_ignored))
+
+    def has_section_headers(self, include_ignored=True):
+        return next(self._of_class('Section-header', include_ignored), None) is not None
+
+    def chapter_body(self, page_data, chapter_detection):
+        header = class_id('Section-header')
+        start = self._positions[page_data['page']]
+        first = self._pages[start]
+        after = np.flatnonzero((first.ids == chapter_detection['id']) & (first.class_ids == header))
+        first_row = int(after[0]) + 1 if len(after) else len(first)
+        for page in self._pages[start:]:
+            if page.ignore:
+                continue
+            stub = page.stub()
+            for row in range(first_row if page is first else 0, len(page)):
+                if page.class_ids[row] == header:
+                    return
+                yield stub, page.detection(row, with_id=True)
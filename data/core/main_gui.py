@@ -1,4 +1,5 @@
 import platform
+import time
 import tkinter as tk
 from tkinter import messagebox, simpledialog
 from PIL import Image
@@ -8,15 +9,13 @@ from data.data_manager import DataManager
 from image_utils.image_utils import ImageUtils
 from handlers.event_handlers import EventHandlers
 from image_utils.image_bbox import ImageBBoxMode
-from data.exporters.export_epub import EPUBExporter
 from data.metadata.metadata_manager import MetadataManager
-from data.exporters.export_pdf import PDFExporter
-from data.exporters.export_plain import TextExporter
 
 from handlers.on_click_handler import handle_click  
 
 class PDFViewer(tk.Tk):
     def __init__(self, json_path, pdf_path):
+        open_start = time.perf_counter()
         super().__init__()
         self.title("PDF Viewer and Editor")
         self.geometry("1400x800")
@@ -37,7 +36,7 @@ class PDFViewer(tk.Tk):
         self.add_text_mode = False
 
         self.data_manager = DataManager(self.json_path, self.pdf_path)
-        self.data = self.data_manager.data
+        self.document = self.data_manager.document
         self.metadata = self.data_manager.metadata
         self.doc = self.data_manager.doc
 
@@ -125,6 +124,9 @@ class PDFViewer(tk.Tk):
         
         self.page_counter_label = tk.Label(self.controls_frame, text="", bg="grey", fg="white", font=("Helvetica", 12))
         self.page_counter_label.pack(pady=10)
+
+        self.save_status_label = tk.Label(self.controls_frame, text="", bg="grey", fg="white", wraplength=left_panel_width - 10)
+        self.save_status_label.pack(pady=10)
                
         self.toc_label = tk.Label(self.toc_frame, text="Table of Contents", bg="lightgrey", fg="black")
         self.toc_label.pack(pady=10)
@@ -170,6 +172,7 @@ class PDFViewer(tk.Tk):
 
         self.toc_listbox.bind("<Double-Button-1>", self.on_toc_click)
         self.bind("<Configure>", self.on_resize)
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
 
         self.selected_toc_index = None
         self.selected_image_index = None
@@ -180,13 +183,15 @@ class PDFViewer(tk.Tk):
         self.populate_images_list()
         self.metadata_manager.display_metadata()
         self.display_page()
+        self.after(200, self.poll_saves)
+        print(f"Viewer ready in {time.perf_counter() - open_start:.3f} s")
 
     def display_page(self):
         print(f"Displaying page {self.page_index + 1}")  
         self.left_canvas.delete("all")
         self.right_canvas.delete("all")
 
-        page_data = self.data['pages'][self.page_index]
+        page_data = self.document.page_at(self.page_index)
         page_num = page_data['page'] - 1  
 
         
@@ -253,9 +258,6 @@ class PDFViewer(tk.Tk):
             max_width = self.left_canvas.winfo_width() * 0.9  
 
             detections = page_data.get('detections', [])
-            for idx, detection in enumerate(detections):
-                detection['id'] = detection.get('id', idx)
-
             sorted_detections = sorted(
                 [d for d in detections if d['class'] in ['Text', 'Section-header']],
                 key=lambda d: (d['bbox'][1], d['bbox'][0])  
@@ -346,7 +348,7 @@ class PDFViewer(tk.Tk):
                         y_offset += line_height + 5  
 
         
-        total_pages = len(self.data['pages'])
+        total_pages = self.document.page_count()
         current_page_display = self.page_index + 1  
         self.page_counter_label.config(text=f"Page {current_page_display} of {total_pages}")
         
@@ -369,7 +371,7 @@ class PDFViewer(tk.Tk):
 
     
     def next_page(self):
-        if self.page_index < len(self.data['pages']) - 1:
+        if self.page_index < self.document.page_count() - 1:
             self.page_index += 1
             self.display_page()
 
@@ -379,8 +381,8 @@ class PDFViewer(tk.Tk):
             self.display_page()
     
     def toggle_ignore_page(self):
-        page_data = self.data['pages'][self.page_index]
-        page_data['ignore'] = not page_data.get('ignore', False)
+        page_data = self.document.page_at(self.page_index)
+        self.document.set_page_ignored(page_data['page'], not page_data.get('ignore', False))
         if page_data['ignore']:
             self.ignore_page_button.config(text="Unignore This Page")
         else:
@@ -437,17 +439,15 @@ class PDFViewer(tk.Tk):
         if result:
             bbox, rect_id = result
             print(f"New bbox: {bbox}, rect_id: {rect_id}")  
-            page_data = self.data['pages'][self.page_index]
+            page_data = self.document.page_at(self.page_index)
             image_name = f"image_{self.image_counter}"
             self.image_counter += 1
-            image_data = {
+            image_data = self.document.add_detection(page_data['page'], {
                 'bbox': bbox,
                 'class': 'Picture',
                 'name': image_name,
                 'canvas_id': rect_id,  
-                'id': max([d.get('id', 0) for d in page_data.get('detections', [])], default=0) + 1
-            }
-            page_data['detections'].append(image_data)
+            })
             
             if platform.system() == 'Darwin':
                 right_click_event = "<Button-2>"
@@ -462,8 +462,8 @@ class PDFViewer(tk.Tk):
             print("Page displayed after adding bbox")  
 
     def delete_image_bbox(self, event, img_data):
-        page_data = self.data['pages'][self.page_index]
-        page_data['detections'] = [det for det in page_data.get('detections', []) if det != img_data]
+        page_data = self.document.page_at(self.page_index)
+        self.document.remove_detection(page_data['page'], img_data['id'])
         self.right_canvas.delete(img_data.get('canvas_id'))
         self.populate_images_list()
         self.data_manager.save_data()
@@ -508,14 +508,18 @@ class PDFViewer(tk.Tk):
     def export_as(self, format_type, window):
         window.destroy()  
 
+        # Exporters pull in ebooklib/reportlab, so they are imported only when an export is requested.
         if format_type == "epub":
-            exporter = EPUBExporter(self.data, self.metadata, self.pdf_path)
+            from data.exporters.export_epub import EPUBExporter
+            exporter = EPUBExporter(self.document, self.metadata, self.pdf_path)
             exporter.export_to_epub(self)
         elif format_type == "pdf":
-            exporter = PDFExporter(self.data, self.metadata, self.pdf_path)
+            from data.exporters.export_pdf import PDFExporter
+            exporter = PDFExporter(self.document, self.metadata, self.pdf_path)
             exporter.export_to_pdf(self)
         elif format_type == "txt":
-            exporter = TextExporter(self.data, self.metadata, self.pdf_path)
+            from data.exporters.export_plain import TextExporter
+            exporter = TextExporter(self.document, self.metadata, self.pdf_path)
             exporter.export_to_txt(self)
         else:
             messagebox.showerror("Error", f"Unknown export format: {format_type}")
@@ -543,25 +547,24 @@ class PDFViewer(tk.Tk):
         self.toc_listbox.delete(0, tk.END)
         self.chapter_counter = 0  
         self.toc_data_list = []  
-        for page_data in self.data['pages']:
-            for detection in page_data.get('detections', []):
-                if detection.get('class') == 'Section-header':
-                    chapter_name = detection.get('name', detection['text'])
-                    page_num = page_data['page']
-                    text_snippet = detection['text'][:100]  
-                    self.chapter_counter += 1
-                    self.toc_listbox.insert(tk.END, f"(Page {page_num}): {chapter_name}")
-                    self.toc_data_list.append((page_data, detection))  
-                if 'chapter_words' in detection:
-                    for idx_w_str, chapter_name in detection['chapter_words'].items():
-                        idx_w = int(idx_w_str)  
-                        words = detection['text'].split()
-                        if idx_w < len(words):
-                            word = words[idx_w]
-                            page_num = page_data['page']
-                            text_snippet = word[:30]
-                            self.chapter_counter += 1
-                            self.toc_listbox.insert(tk.END, f"{chapter_name} (Page {page_num}): {text_snippet}")
+        for page_data, detection in self.document.toc_entries():
+            if detection.get('class') == 'Section-header':
+                chapter_name = detection.get('name', detection['text'])
+                page_num = page_data['page']
+                text_snippet = detection['text'][:100]  
+                self.chapter_counter += 1
+                self.toc_listbox.insert(tk.END, f"(Page {page_num}): {chapter_name}")
+                self.toc_data_list.append((page_data, detection))  
+            if 'chapter_words' in detection:
+                for idx_w_str, chapter_name in detection['chapter_words'].items():
+                    idx_w = int(idx_w_str)  
+                    words = detection['text'].split()
+                    if idx_w < len(words):
+                        word = words[idx_w]
+                        page_num = page_data['page']
+                        text_snippet = word[:30]
+                        self.chapter_counter += 1
+                        self.toc_listbox.insert(tk.END, f"{chapter_name} (Page {page_num}): {text_snippet}")
                             
                             
     def show_toc_context_menu(self, event):
@@ -585,9 +588,7 @@ class PDFViewer(tk.Tk):
             
             page_data, detection = self.toc_data_list[index]
 
-            detection['class'] = 'Text'  
-            if 'name' in detection:
-                del detection['name']
+            self.document.set_class(page_data['page'], detection['id'], 'Text', name=None)
  
             self.populate_toc()
 
@@ -606,7 +607,7 @@ class PDFViewer(tk.Tk):
             new_name = simpledialog.askstring("Rename Chapter", "Enter new chapter name:", initialvalue=current_name, parent=self)
             if new_name:
                 
-                detection['name'] = new_name
+                self.document.update_detection(page_data['page'], detection['id'], name=new_name)
 
                 self.populate_toc()
 
@@ -627,8 +628,9 @@ class PDFViewer(tk.Tk):
                     page_num = int(item_text.split('Page ')[1].split(')')[0]) - 1
                 else:
                     page_num = int(item_text.split('Page ')[1].split(')')[0]) - 1
-                if 0 <= page_num < len(self.data['pages']):
-                    self.page_index = page_num
+                page_data = self.document.page(page_num + 1)
+                if page_data is not None:
+                    self.page_index = page_data['index']
                     self.display_page()
                 else:
                     print(f"Invalid page number extracted: {page_num + 1}")  
@@ -639,17 +641,15 @@ class PDFViewer(tk.Tk):
     def populate_images_list(self):
         self.images_listbox.delete(0, tk.END)
         self.images_data_list = []  
-        for page_data in self.data['pages']:
+        for page_data, detection in self.document.pictures():
             page_num = page_data['page']
-            for detection in page_data.get('detections', []):
-                if detection['class'] == 'Picture':
-                    image_name = detection.get('name', f"image_{self.data_manager.image_counter}")
-                    if image_name is None:
-                        image_name = f"image_{self.data_manager.image_counter}"
-                        detection['name'] = image_name
-                        self.data_manager.image_counter += 1
-                    self.images_listbox.insert(tk.END, f"Page {page_num}: {image_name}")
-                    self.images_data_list.append((page_data, detection))
+            image_name = detection.get('name', f"image_{self.data_manager.image_counter}")
+            if image_name is None:
+                image_name = f"image_{self.data_manager.image_counter}"
+                detection['name'] = image_name
+                self.data_manager.image_counter += 1
+            self.images_listbox.insert(tk.END, f"Page {page_num}: {image_name}")
+            self.images_data_list.append((page_data, detection))
 
     def show_images_context_menu(self, event):
         try:
@@ -670,13 +670,13 @@ class PDFViewer(tk.Tk):
             
             page_data, img_data = self.images_data_list[index]
 
-            page_data['detections'].remove(img_data)
+            self.document.remove_detection(page_data['page'], img_data['id'])
 
             self.populate_images_list()
 
             self.data_manager.save_data()
 
-            if self.page_index == self.data['pages'].index(page_data):
+            if self.page_index == page_data['index']:
                 self.display_page()
 
             self.selected_image_index = None
@@ -690,13 +690,13 @@ class PDFViewer(tk.Tk):
             new_name = simpledialog.askstring("Rename Image", "Enter new image name:", initialvalue=img_data['name'], parent=self)
             if new_name:
                 
-                img_data['name'] = new_name
+                self.document.update_detection(page_data['page'], img_data['id'], name=new_name)
 
                 self.populate_images_list()
 
                 self.data_manager.save_data()
 
-                if self.page_index == self.data['pages'].index(page_data):
+                if self.page_index == page_data['index']:
                     self.display_page()
 
                 self.selected_image_index = None
@@ -706,8 +706,8 @@ class PDFViewer(tk.Tk):
         if selection:
             index = selection[0]
             page_data, img_data = self.images_data_list[index]
-            page_num = page_data['page'] - 1  
-            if 0 <= page_num < len(self.data['pages']):
+            page_num = page_data['index']
+            if 0 <= page_num < self.document.page_count():
                 self.page_index = page_num
                 self.display_page()
             else:
@@ -717,22 +717,38 @@ class PDFViewer(tk.Tk):
     def on_resize(self, event):
         self.display_page()
 
+    def poll_saves(self):
+        for status, message in self.data_manager.save_results():
+            print(message)
+            if status == 'error':
+                self.save_status_label.config(text="Save failed", fg="red")
+                messagebox.showerror("Error", message)
+            else:
+                self.save_status_label.config(text="All changes saved", fg="white")
+        self.after(200, self.poll_saves)
+
+    def on_close(self):
+        try:
+            self.data_manager.close()
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to save data: {e}")
+        self.destroy()
+
     
     def export_to_epub(self):
-        exporter = EPUBExporter(self.data, self.metadata, self.pdf_path)
+        from data.exporters.export_epub import EPUBExporter
+        exporter = EPUBExporter(self.document, self.metadata, self.pdf_path)
         exporter.open_export_window(self)
      
     def toggle_chapter_start(self, detection):
+        page_number = self.document.page_at(self.page_index)['page']
         if detection.get('class') != 'Section-header':
-            detection['class'] = 'Section-header'
             
             chapter_name = detection['text']
-            detection['name'] = chapter_name
+            self.document.set_class(page_number, detection['id'], 'Section-header', name=chapter_name)
             self.chapter_counter += 1
         else:
-            detection['class'] = 'Text'
-            if 'name' in detection:
-                del detection['name']
+            self.document.set_class(page_number, detection['id'], 'Text', name=None)
         self.populate_toc()
         self.data_manager.save_data()
 
@@ -1,9 +1,9 @@
-from transformers import AutoModelForCausalLM, AutoTokenizer
-from PIL import Image
 import logging
 
 class CaptioningModel:
     def __init__(self):
+        from transformers import AutoModelForCausalLM, AutoTokenizer
+
         model_id = "vikhyatk/moondream2"
         revision = "2024-08-26"
         try:
@@ -29,3 +29,20 @@ class CaptioningModel:
         except Exception as e:
             logging.error(f"Error during image captioning: {e}")
             return ""
+
+    def caption_batch(self, images):
+        if not images:
+            return []
+        if self.model is None or self.tokenizer is None:
+            logging.error("Captioning model is not initialized.")
+            return ["" for _ in images]
+        try:
+            # batch_answer encodes all images in one pass before generating the answers.
+            return self.model.batch_answer(
+                images=images,
+                prompts=["Describe this image."] * len(images),
+                tokenizer=self.tokenizer,
+            )
+        except Exception as e:
+            logging.error(f"Error during batched image captioning, captioning one by one: {e}")
+            return [self.caption(image) for image in images]
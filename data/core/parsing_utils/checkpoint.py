@@ -0,0 +1,69 @@
+import json
+import logging
+import os
+
+
+class PageCheckpoint:
+    """Append-only JSONL sidecar holding the pages finished so far.
+
+    Every finished page is written as one line and fsynced, so a crashed or
+    preempted run can be resumed from the last complete page. Only the byte
+    offset of each page is kept in memory; pages are read back on demand.
+    """
+
+    def __init__(self, output_json):
+        self.path = output_json + ".partial.jsonl"
+        self._file = None
+        self._valid_size = 0
+        self._offsets = {}
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def load(self):
+        self._offsets = {}
+        self._valid_size = 0
+        if not self.exists():
+            return []
+        with open(self.path, 'rb') as f:
+            for line in f:
+                try:
+                    page_data = json.loads(line)
+                except ValueError:
+                    # A torn last line from a crash mid-write; it is cut off on reopen.
+                    logging.warning(f"Ignoring incomplete checkpoint entry in {self.path}")
+                    break
+                self._offsets[page_data['page']] = self._valid_size
+                self._valid_size += len(line)
+        logging.debug(f"Found {len(self._offsets)} checkpointed pages in {self.path}")
+        return sorted(self._offsets)
+
+    def read(self, page_number):
+        with open(self.path, 'rb') as f:
+            f.seek(self._offsets[page_number])
+            return json.loads(f.readline())
+
+    def open(self, resume=False):
+        if resume and self.exists():
+            with open(self.path, 'r+b') as f:
+                f.truncate(self._valid_size)
+            self._file = open(self.path, 'ab')
+        else:
+            self._offsets = {}
+            self._file = open(self.path, 'wb')
+
+    def append(self, page_data):
+        self._offsets[page_data['page']] = self._file.tell()
+        self._file.write((json.dumps(page_data, ensure_ascii=False) + "\n").encode('utf-8'))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def remove(self):
+        self.close()
+        if self.exists():
+            os.remove(self.path)
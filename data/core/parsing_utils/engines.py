@@ -0,0 +1,28 @@
+import importlib
+
+from data.core.parsing_utils.inference_client import RemoteRecognizer, server_url
+
+# Engine names match the choices offered in run.py's OCR configuration window.
+ENGINES = {
+    "GOT-OCR2_CPU": ("data.core.parsing_utils.ocr_got_cpu", "GOTRecognizer", None),
+    "Tesseract": ("data.core.parsing_utils.ocr_tesseract", "TesseractRecognizer", "eng"),
+    "PaddleOCR": ("data.core.parsing_utils.ocr_paddle", "PaddleRecognizer", "en"),
+}
+
+
+def create_local_recognizer(engine, language=None, **options):
+    if engine not in ENGINES:
+        raise ValueError(f"Unsupported OCR model selected: {engine}")
+    module_name, class_name, default_language = ENGINES[engine]
+    recognizer_class = getattr(importlib.import_module(module_name), class_name)
+    if default_language is not None:
+        options['language'] = language or default_language
+    return recognizer_class(**options)
+
+
+def create_recognizer(engine, language=None, **options):
+    # With PDFCURATOR_SERVER set, recognition runs in the warm inference server instead.
+    url = server_url()
+    if url:
+        return RemoteRecognizer(url, engine, language, **options)
+    return create_local_recognizer(engine, language, **options)
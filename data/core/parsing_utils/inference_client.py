@@ -0,0 +1,149 @@
+import io
+import json
+import logging
+import os
+import urllib.error
+import urllib.request
+
+import numpy as np
+import supervision as sv
+
+from data.core.parsing_utils.ocr_cache import OCRCache
+from data.core.parsing_utils.pipeline import OCRPipeline, Recognizer
+
+SERVER_URL_ENV = "PDFCURATOR_SERVER"
+
+
+def server_url():
+    return os.environ.get(SERVER_URL_ENV) or None
+
+
+def encode_payload(arrays, meta=None):
+    # Arrays travel as an .npz archive (no pickling); `meta` rides along as UTF-8 JSON bytes.
+    buffer = io.BytesIO()
+    named = {f"a{i}": np.ascontiguousarray(array) for i, array in enumerate(arrays)}
+    named['meta'] = np.frombuffer(json.dumps(meta or {}).encode('utf-8'), dtype=np.uint8)
+    np.savez(buffer, **named)
+    return buffer.getvalue()
+
+
+def decode_payload(body):
+    with np.load(io.BytesIO(body), allow_pickle=False) as archive:
+        meta = json.loads(archive['meta'].tobytes().decode('utf-8'))
+        arrays = [archive[f"a{i}"] for i in range(len(archive.files) - 1)]
+    return arrays, meta
+
+
+class InferenceClient:
+    """Talks to a running inference server (see inference_server.py).
+
+    Exposes the same methods as LayoutDetector and CaptioningModel, so it can
+    stand in for both when PDFCURATOR_SERVER is set.
+    """
+
+    def __init__(self, url, timeout=600):
+        self.url = url.rstrip('/')
+        self.timeout = timeout
+        self._class_names = None
+
+    def _request(self, path, body=None):
+        request = urllib.request.Request(
+            self.url + path,
+            data=body,
+            method="POST" if body is not None else "GET",
+            headers={'Content-Type': 'application/octet-stream'},
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read().decode('utf-8'))
+        except urllib.error.HTTPError as e:
+            message = json.loads(e.read().decode('utf-8')).get('error', str(e))
+            raise RuntimeError(f"Inference server {self.url}{path}: {message}") from None
+
+    def health(self):
+        return self._request("/health")
+
+    def detect_layout(self, image):
+        return self.detect_layout_batch([image])[0]
+
+    def detect_layout_batch(self, images):
+        if not images:
+            return []
+        response = self._request("/detect", encode_payload(images))
+        batch_detections = []
+        for detections in response['detections']:
+            if not detections['class_id']:
+                batch_detections.append(sv.Detections.empty())
+                continue
+            batch_detections.append(sv.Detections(
+                xyxy=np.array(detections['xyxy'], dtype=np.float32),
+                class_id=np.array(detections['class_id'], dtype=int),
+                confidence=np.array(detections['confidence'], dtype=np.float32),
+            ))
+        return batch_detections
+
+    def get_class_name(self, class_id):
+        if self._class_names is None:
+            self._class_names = {int(k): v for k, v in self._request("/classes")['class_names'].items()}
+        return self._class_names.get(int(class_id), "Unknown")
+
+    def caption(self, image):
+        return self.caption_batch([image])[0]
+
+    def caption_batch(self, images):
+        if not images:
+            return []
+        arrays = [np.asarray(image.convert("RGB")) for image in images]
+        return self._request("/caption", encode_payload(arrays))['captions']
+
+    def engine_info(self, engine, language):
+        return self._request("/engine", encode_payload([], {'engine': engine, 'language': language}))
+
+    def recognize_batch(self, engine, language, crops):
+        arrays = [cropped_image for cropped_image, _ in crops]
+        meta = {
+            'engine': engine,
+            'language': language,
+            'class_names': [class_name for _, class_name in crops],
+        }
+        return self._request("/recognize", encode_payload(arrays, meta))['texts']
+
+
+class RemoteRecognizer(Recognizer):
+    """Recognizer whose model lives in the inference server."""
+
+    def __init__(self, url, engine, language=None, **options):
+        if options:
+            # The server loads each engine once with its defaults; a silent difference is worse than an error.
+            raise ValueError(f"Options {sorted(options)} are not supported with the inference server")
+        self.client = InferenceClient(url)
+        info = self.client.engine_info(engine, language)
+        self.engine = engine
+        self.name = info['name']
+        self.version = info['version']
+        self.language = info['language']
+
+    def recognize(self, cropped_image, class_name):
+        return self.recognize_batch([(cropped_image, class_name)])[0]
+
+    def recognize_batch(self, crops):
+        if not crops:
+            return []
+        return self.client.recognize_batch(self.engine, self.language, crops)
+
+
+def extract_text_from_pdf(pdf_path, output_json, progress_queue=None, engine="Tesseract", language=None, use_captioning=False, batch_pages=1, resume=False, use_cache=True, stats=None):
+    # Thin-client counterpart of the ocr_* modules: no model is loaded in this process.
+    recognizer = None
+    try:
+        recognizer = RemoteRecognizer(server_url(), engine, language)
+        cache = OCRCache() if use_cache else None
+        pipeline = OCRPipeline(recognizer, use_captioning=use_captioning, batch_pages=batch_pages, cache=cache)
+        pipeline.run(pdf_path, output_json, progress_queue, resume=resume, stats=stats)
+
+    except Exception as e:
+        logging.error(f"Error in extract_text_from_pdf: {e}")
+        raise
+    finally:
+        if recognizer is not None:
+            recognizer.close()
@@ -0,0 +1,233 @@
+import json
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from PIL import Image
+
+from data.core.parsing_utils.engines import ENGINES, create_local_recognizer
+from data.core.parsing_utils.inference_client import decode_payload
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+
+class RequestBatcher:
+    """Merges concurrent requests into one model call.
+
+    Each request is a list of items. The worker thread takes the first waiting
+    request, then keeps collecting until `max_items` items are queued or
+    `max_wait` seconds have passed, runs `handler` once on all of them and hands
+    every request back its own slice of the results.
+    """
+
+    def __init__(self, handler, max_items=32, max_wait=0.02):
+        self.handler = handler
+        self.max_items = max_items
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, items):
+        if not items:
+            return []
+        future = Future()
+        self._queue.put((items, future))
+        return future.result()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            item_count = len(batch[0][0])
+            deadline = time.monotonic() + self.max_wait
+            while item_count < self.max_items:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    request = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                batch.append(request)
+                item_count += len(request[0])
+
+            items = [item for request_items, _ in batch for item in request_items]
+            try:
+                results = self.handler(items)
+            except Exception as e:
+                logging.error(f"Batched inference failed: {e}")
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            logging.debug(f"Ran {len(items)} items from {len(batch)} requests in one batch")
+            offset = 0
+            for request_items, future in batch:
+                future.set_result(results[offset:offset + len(request_items)])
+                offset += len(request_items)
+
+
+class InferenceService:
+    """Keeps the layout, OCR and captioning models loaded between requests.
+
+    `engine_options` maps an engine name to extra recognizer arguments used
+    when it is loaded, e.g. {'Tesseract': {'workers': 8}}.
+    """
+
+    def __init__(self, max_batch=32, max_wait=0.02, engine_options=None):
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.engine_options = engine_options or {}
+        self._lock = threading.Lock()
+        # One lock per model, so loading an engine does not hold up requests to the others.
+        self._model_locks = {}
+        self._detector = None
+        self._captioner = None
+        self._recognizers = {}
+        self._recognize_batchers = {}
+        self._detect_batcher = RequestBatcher(self._detect, max_batch, max_wait)
+        self._caption_batcher = RequestBatcher(self._caption, max_batch, max_wait)
+
+    def _model_lock(self, key):
+        with self._lock:
+            return self._model_locks.setdefault(key, threading.Lock())
+
+    @property
+    def detector(self):
+        # The local models are used directly; going through get_layout_detector()
+        # would route back to this server if PDFCURATOR_SERVER is set here too.
+        with self._model_lock('detector'):
+            if self._detector is None:
+                from data.core.parsing_utils.layout_detection import _initialize_detector
+                self._detector = _initialize_detector()
+            return self._detector
+
+    @property
+    def captioner(self):
+        with self._model_lock('captioner'):
+            if self._captioner is None:
+                from data.core.parsing_utils.caption import CaptioningModel
+                self._captioner = CaptioningModel()
+            return self._captioner
+
+    def _engine_key(self, engine, language):
+        if engine not in ENGINES:
+            raise ValueError(f"Unsupported OCR model selected: {engine}")
+        return engine, language or ENGINES[engine][2]
+
+    def recognizer(self, engine, language=None):
+        key = self._engine_key(engine, language)
+        with self._model_lock(key):
+            if key not in self._recognizers:
+                recognizer = create_local_recognizer(*key, **self.engine_options.get(engine, {}))
+                batcher = RequestBatcher(recognizer.recognize_batch, self.max_batch, self.max_wait)
+                with self._lock:
+                    self._recognize_batchers[key] = batcher
+                    self._recognizers[key] = recognizer
+                logging.info(f"Loaded OCR engine {engine} ({recognizer.language or 'default language'})")
+            return self._recognizers[key]
+
+    def _detect(self, images):
+        return self.detector.detect_layout_batch(images)
+
+    def _caption(self, images):
+        return self.captioner.caption_batch(images)
+
+    def engine_info(self, engine, language=None):
+        recognizer = self.recognizer(engine, language)
+        return {'name': recognizer.name, 'version': recognizer.version, 'language': recognizer.language}
+
+    def class_names(self):
+        return {str(class_id): name for class_id, name in dict(self.detector.class_names).items()}
+
+    def detect(self, images):
+        detections = []
+        for page_detections in self._detect_batcher.submit(images):
+            detections.append({
+                'xyxy': page_detections.xyxy.tolist(),
+                'class_id': page_detections.class_id.tolist() if page_detections.class_id is not None else [],
+                'confidence': page_detections.confidence.tolist() if page_detections.confidence is not None else [],
+            })
+        return detections
+
+    def recognize(self, engine, language, crops):
+        self.recognizer(engine, language)
+        return self._recognize_batchers[self._engine_key(engine, language)].submit(crops)
+
+    def caption(self, images):
+        return self._caption_batcher.submit(images)
+
+    def close(self):
+        with self._lock:
+            recognizers = list(self._recognizers.values())
+        for recognizer in recognizers:
+            recognizer.close()
+
+
+class InferenceRequestHandler(BaseHTTPRequestHandler):
+    service = None
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(200, {'status': 'ok', 'engines': [f"{engine}:{language}" for engine, language in list(self.service._recognizers)]})
+        elif self.path == "/classes":
+            self._send_json(200, {'class_names': self.service.class_names()})
+        else:
+            self._send_json(404, {'error': f"Unknown endpoint {self.path}"})
+
+    def do_POST(self):
+        try:
+            arrays, meta = decode_payload(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            if self.path == "/detect":
+                response = {'detections': self.service.detect(arrays)}
+            elif self.path == "/recognize":
+                crops = list(zip(arrays, meta['class_names']))
+                response = {'texts': self.service.recognize(meta['engine'], meta.get('language'), crops)}
+            elif self.path == "/caption":
+                images = [Image.fromarray(array) for array in arrays]
+                response = {'captions': self.service.caption(images)}
+            elif self.path == "/engine":
+                response = self.service.engine_info(meta['engine'], meta.get('language'))
+            else:
+                self._send_json(404, {'error': f"Unknown endpoint {self.path}"})
+                return
+        except Exception as e:
+            logging.error(f"Request to {self.path} failed: {e}")
+            self._send_json(500, {'error': f"{type(e).__name__}: {e}"})
+            return
+        self._send_json(200, response)
+
+    def log_message(self, format, *args):
+        logging.debug(f"{self.address_string()} - {format % args}")
+
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, preload=(), captioning=False, max_batch=32, max_wait=0.02, engine_options=None):
+    service = InferenceService(max_batch=max_batch, max_wait=max_wait, engine_options=engine_options)
+    service.detector
+    if captioning:
+        service.captioner
+    for engine, language in preload:
+        service.recognizer(engine, language)
+
+    handler = type("BoundInferenceRequestHandler", (InferenceRequestHandler,), {'service': service})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    logging.info(f"Inference server listening on http://{host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
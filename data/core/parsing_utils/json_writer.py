@@ -0,0 +1,63 @@
+import json
+import os
+
+
+class StreamingJSONWriter:
+    """Writes the document JSON one page at a time.
+
+    The output has the same layout as `json.dump(..., indent=4)` of the whole
+    document, but only the page being written is ever serialized, so memory
+    stays flat regardless of page count. Data goes to a temporary file that
+    replaces `path` on close, so a failed run never leaves a truncated JSON.
+    """
+
+    def __init__(self, path, metadata=None, indent=4):
+        self.path = path
+        self.temp_path = path + ".tmp"
+        self.metadata = metadata or {}
+        self.indent = indent
+        self._file = None
+        self._pages_written = 0
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def _dumps(self, value, depth):
+        text = json.dumps(value, indent=self.indent, ensure_ascii=False)
+        return text.replace("\n", "\n" + " " * (self.indent * depth))
+
+    def open(self):
+        self._file = open(self.temp_path, 'w', encoding='utf-8')
+        pad = " " * self.indent
+        self._file.write("{\n" + pad + '"metadata": ' + self._dumps(self.metadata, 1) + ",\n" + pad + '"pages": [')
+
+    def write_page(self, page_data):
+        pad = " " * (self.indent * 2)
+        separator = "," if self._pages_written else ""
+        self._file.write(separator + "\n" + pad + self._dumps(page_data, 2))
+        self._pages_written += 1
+
+    def close(self):
+        if self._pages_written:
+            self._file.write("\n" + " " * self.indent + "]\n}")
+        else:
+            self._file.write("]\n}")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        self._file = None
+        os.replace(self.temp_path, self.path)
+
+    def abort(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
@@ -1,13 +1,8 @@
-import cv2
-import numpy as np
-from ultralytics import YOLO
 import supervision as sv
 import logging
 import threading
 import glob
-
-
-from data.core.parsing_utils.caption import CaptioningModel
+import os
 
 
 logging.basicConfig(
@@ -30,6 +25,8 @@ class LayoutDetector:
     def __init__(self, model_path, conf_threshold=0.2, iou_threshold=0.8):
         if self._initialized:
             return
+        # Imported here so that importing this module does not pull in torch.
+        from ultralytics import YOLO
         self.model = YOLO(model_path)
         self.class_names = self.model.names
         self.conf_threshold = conf_threshold
@@ -37,9 +34,6 @@ class LayoutDetector:
         logging.debug(f"YOLO model loaded from {model_path}")
         self._initialized = True
 
-        
-        self.captioning_model = CaptioningModel()
-
     def detect_layout(self, image):
         try:
             results = self.model(image, conf=self.conf_threshold, iou=self.iou_threshold)[0]
@@ -50,6 +44,18 @@ class LayoutDetector:
             logging.error(f"Layout detection failed: {e}")
             return sv.Detections.empty()
 
+    def detect_layout_batch(self, images):
+        if not images:
+            return []
+        try:
+            results = self.model(list(images), conf=self.conf_threshold, iou=self.iou_threshold)
+            batch_detections = [sv.Detections.from_ultralytics(result) for result in results]
+            logging.debug(f"Detected layout elements for a batch of {len(images)} pages")
+            return batch_detections
+        except Exception as e:
+            logging.error(f"Batched layout detection failed: {e}")
+            return [self.detect_layout(image) for image in images]
+
     def get_class_name(self, class_id):
         try:
             return self.class_names[class_id]
@@ -58,20 +64,59 @@ class LayoutDetector:
             return "Unknown"
 
     def caption_image(self, image):
-        return self.captioning_model.caption(image)
+        return get_captioning_model().caption(image)
+
+    def caption_images(self, images):
+        return get_captioning_model().caption_batch(images)
 
 
 def _initialize_detector():
     model_path = glob.glob("data/models/*.pt")[0]  
     return LayoutDetector(model_path=model_path)
 
-_layout_detector = _initialize_detector()
+# Models are created on first use rather than at import time, so importing the
+# OCR modules is cheap and moondream is only loaded when captioning is requested.
+_models_lock = threading.Lock()
+_layout_detector = None
+_captioning_model = None
+
+def _remote_client():
+    # PDFCURATOR_SERVER points at a running inference server that already has the models loaded.
+    url = os.environ.get("PDFCURATOR_SERVER")
+    if not url:
+        return None
+    from data.core.parsing_utils.inference_client import InferenceClient
+    logging.debug(f"Using inference server at {url}")
+    return InferenceClient(url)
+
+def get_layout_detector():
+    global _layout_detector
+    if _layout_detector is None:
+        with _models_lock:
+            if _layout_detector is None:
+                _layout_detector = _remote_client() or _initialize_detector()
+    return _layout_detector
+
+def get_captioning_model():
+    global _captioning_model
+    if _captioning_model is None:
+        with _models_lock:
+            if _captioning_model is None:
+                from data.core.parsing_utils.caption import CaptioningModel
+                _captioning_model = _remote_client() or CaptioningModel()
+    return _captioning_model
 
 def detect_layout(image):
-    return _layout_detector.detect_layout(image)
+    return get_layout_detector().detect_layout(image)
+
+def detect_layout_batch(images):
+    return get_layout_detector().detect_layout_batch(images)
 
 def get_class_name(class_id):
-    return _layout_detector.get_class_name(class_id)
+    return get_layout_detector().get_class_name(class_id)
 
 def caption_image(image):
-    return _layout_detector.caption_image(image)
+    return get_captioning_model().caption(image)
+
+def caption_images(images):
+    return get_captioning_model().caption_batch(images)
@@ -0,0 +1,116 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "pdfcurator", "ocr_cache.sqlite")
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+def crop_digest(cropped_image):
+    digest = hashlib.sha256()
+    digest.update(f"{cropped_image.shape}|{cropped_image.dtype}".encode())
+    digest.update(cropped_image.tobytes())
+    return digest.hexdigest()
+
+
+class OCRCache:
+    """Persistent OCR results keyed by crop pixels and engine identity.
+
+    Entries live in a single SQLite file and are evicted least recently used
+    first once the stored text exceeds `max_bytes`. The total size is kept
+    in a one-row `meta` table that every write updates in its own
+    transaction, so all processes sharing the file (convert.py workers, the
+    GUI, the inference server) see the same total without summing the
+    entries.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " key TEXT PRIMARY KEY, text TEXT NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (id INTEGER PRIMARY KEY CHECK (id = 0), total INTEGER NOT NULL)")
+        # Caches written before the meta table existed get their total summed once.
+        self._conn.execute("INSERT OR IGNORE INTO meta (id, total) SELECT 0, COALESCE(SUM(size), 0) FROM entries")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(cropped_image, engine, version, language, class_name=""):
+        return hashlib.sha256(
+            f"{crop_digest(cropped_image)}|{engine}|{version}|{language}|{class_name}".encode()
+        ).hexdigest()
+
+    def _select(self, column, keys):
+        """{key: column} for the given keys that are in the cache."""
+        found = {}
+        unique_keys = list(set(keys))
+        for start in range(0, len(unique_keys), 500):
+            chunk = unique_keys[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self._conn.execute(
+                f"SELECT key, {column} FROM entries WHERE key IN ({placeholders})", chunk
+            ).fetchall()
+            found.update(rows)
+        return found
+
+    def get_many(self, keys):
+        if not keys:
+            return {}
+        now = time.time()
+        with self._lock:
+            found = self._select("text", keys)
+            if found:
+                self._conn.executemany(
+                    "UPDATE entries SET last_used = ? WHERE key = ?", [(now, key) for key in found]
+                )
+                self._conn.commit()
+        return found
+
+    def put_many(self, items):
+        if not items:
+            return
+        now = time.time()
+        sizes = {key: len(key) + len(text.encode('utf-8')) for key, text in items}
+        with self._lock:
+            # Taken before reading the replaced sizes, so no other process can change them in between.
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                replaced = self._select("size", list(sizes))
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO entries (key, text, size, last_used) VALUES (?, ?, ?, ?)",
+                    [(key, text, sizes[key], now) for key, text in items],
+                )
+                self._conn.execute("UPDATE meta SET total = total + ?", (sum(sizes.values()) - sum(replaced.values()),))
+                total = self._conn.execute("SELECT total FROM meta").fetchone()[0]
+                if total > self.max_bytes:
+                    self._evict(total)
+                self._conn.commit()
+            except BaseException:
+                self._conn.rollback()
+                raise
+
+    def _evict(self, total):
+        excess = total - self.max_bytes
+        removed = 0
+        stale = []
+        for key, size in self._conn.execute("SELECT key, size FROM entries ORDER BY last_used"):
+            stale.append((key,))
+            removed += size
+            if removed >= excess:
+                break
+        self._conn.executemany("DELETE FROM entries WHERE key = ?", stale)
+        self._conn.execute("UPDATE meta SET total = total - ?", (removed,))
+        logging.debug(f"Evicted {len(stale)} OCR cache entries")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -1,103 +1,107 @@
-import json
-import fitz  
-from PIL import Image
 import logging
-import os
 import cv2
 import numpy as np
+import paddleocr
 from paddleocr import PaddleOCR
 
-from data.core.parsing_utils.layout_detection import detect_layout, get_class_name, caption_image  
-
-def extract_text_from_pdf(pdf_path, output_json, progress_queue=None, language='en', use_captioning=False):
-    try:
-        logging.debug(f"Starting OCR on {pdf_path}")
-        doc = fitz.open(pdf_path)
-        data = []
-        num_pages = len(doc)
-        total_tasks = num_pages  
-
-        ocr_model = PaddleOCR(use_angle_cls=True, lang=language)
-
-        for page_num in range(num_pages):
-            page = doc.load_page(page_num)
-            pix = page.get_pixmap()
-            img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-
-            image = np.array(img)
-            image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
-
-            detections = detect_layout(image)
-
-            if detections is None or len(detections) == 0:
-                logging.warning(f"No detections for page {page_num + 1}")
-                detections = sv.Detections.empty()
-
-            page_data = {
-                'page': page_num + 1,
-                'detections': []
-            }
-
-            for i in range(len(detections)):
-                class_id = detections.class_id[i]
-                class_name = get_class_name(class_id)
-                bbox = detections.xyxy[i]  
-                xmin, ymin, xmax, ymax = map(int, bbox)
-
-                xmin = max(0, xmin - 3)
-                ymin = max(0, ymin - 3)
-                xmax = min(image.shape[1], xmax + 3)
-                ymax = min(image.shape[0], ymax + 3)
-
-                cropped_image = image[ymin:ymax, xmin:xmax]
-
-                if class_name.lower() in ['text', 'section-header']:
-                    try:
-                        result = ocr_model.ocr(cropped_image, cls=True)
-                        if result and isinstance(result[0], list):
-                            ocr_text_lines = []
-                            for line in result[0]:
-                                if len(line) > 1 and isinstance(line[1], tuple) and len(line[1]) > 0:
-                                    text = line[1][0]  
-                                    ocr_text_lines.append(text)
-                                else:
-                                    logging.warning(f"Unexpected OCR result format: {line}")
-                            ocr_text = '\n'.join(ocr_text_lines)
-                        else:
-                            ocr_text = ""
-                    except Exception as e:
-                        logging.error(f"Error in PaddleOCR: {e}")
-                        ocr_text = ""
-                elif class_name.lower() in ['image', 'picture']:
-                    if use_captioning:
-                        cropped_image_pil = Image.fromarray(cv2.cvtColor(cropped_image, cv2.COLOR_BGR2RGB))
-                        ocr_text = caption_image(cropped_image_pil)
+from data.core.parsing_utils.ocr_cache import OCRCache
+from data.core.parsing_utils.pipeline import OCRPipeline, Recognizer
+
+
+def _sorted_boxes(dt_boxes):
+    # Top-to-bottom, then left-to-right for boxes on the same line (as PaddleOCR orders them).
+    boxes = sorted(dt_boxes, key=lambda box: (box[0][1], box[0][0]))
+    for i in range(len(boxes) - 1):
+        for j in range(i, -1, -1):
+            if abs(boxes[j + 1][0][1] - boxes[j][0][1]) < 10 and boxes[j + 1][0][0] < boxes[j][0][0]:
+                boxes[j], boxes[j + 1] = boxes[j + 1], boxes[j]
+            else:
+                break
+    return boxes
+
+
+def _crop_text_line(image, points):
+    points = np.array(points, dtype=np.float32)
+    crop_width = int(max(np.linalg.norm(points[0] - points[1]), np.linalg.norm(points[2] - points[3])))
+    crop_height = int(max(np.linalg.norm(points[0] - points[3]), np.linalg.norm(points[1] - points[2])))
+    target = np.float32([[0, 0], [crop_width, 0], [crop_width, crop_height], [0, crop_height]])
+    matrix = cv2.getPerspectiveTransform(points, target)
+    line_image = cv2.warpPerspective(
+        image, matrix, (crop_width, crop_height),
+        borderMode=cv2.BORDER_REPLICATE, flags=cv2.INTER_CUBIC)
+    if line_image.shape[0] * 1.0 / max(line_image.shape[1], 1) >= 1.5:
+        line_image = np.rot90(line_image)
+    return line_image
+
+
+class PaddleRecognizer(Recognizer):
+    name = "paddleocr"
+
+    def __init__(self, language='en'):
+        self.language = language
+        self.version = getattr(paddleocr, '__version__', '')
+        self.ocr_model = PaddleOCR(use_angle_cls=True, lang=language)
+
+    def recognize(self, cropped_image, class_name):
+        try:
+            result = self.ocr_model.ocr(cropped_image, cls=True)
+            if result and isinstance(result[0], list):
+                ocr_text_lines = []
+                for line in result[0]:
+                    if len(line) > 1 and isinstance(line[1], tuple) and len(line[1]) > 0:
+                        text = line[1][0]
+                        ocr_text_lines.append(text)
                     else:
-                        ocr_text = ""
-                else:
-                    ocr_text = ""
-                detection_data = {
-                    'class': class_name,
-                    'bbox': [xmin, ymin, xmax, ymax],
-                    'text': ocr_text
-                }
-                page_data['detections'].append(detection_data)
-
-            data.append(page_data)
-            if progress_queue:
-                progress_queue.put((page_num + 1) / total_tasks)
-
-        doc.close()
-
-        
-        json_output = {
-            "metadata": {},
-            "pages": data
-        }
-        with open(output_json, 'w', encoding='utf-8') as json_file:
-            json.dump(json_output, json_file, indent=4, ensure_ascii=False)
-        logging.debug(f"JSON saved successfully to {output_json}")
+                        logging.warning(f"Unexpected OCR result format: {line}")
+                return '\n'.join(ocr_text_lines)
+            return ""
+        except Exception as e:
+            logging.error(f"Error in PaddleOCR: {e}")
+            return ""
+
+    def recognize_batch(self, crops):
+        try:
+            return self._recognize_lines_batched(crops)
+        except Exception as e:
+            logging.error(f"Batched PaddleOCR failed, falling back to per-crop OCR: {e}")
+            return super().recognize_batch(crops)
+
+    def _recognize_lines_batched(self, crops):
+        # Text-line detection still runs per crop; the angle classifier and the
+        # recognizer then see every line of every crop as one batched list.
+        line_images = []
+        owners = []
+        for crop_index, (cropped_image, _) in enumerate(crops):
+            if cropped_image.size == 0:
+                continue
+            dt_boxes, _ = self.ocr_model.text_detector(cropped_image)
+            if dt_boxes is None:
+                continue
+            for box in _sorted_boxes(dt_boxes):
+                line_images.append(_crop_text_line(cropped_image, box))
+                owners.append(crop_index)
+
+        ocr_text_lines = [[] for _ in crops]
+        if not line_images:
+            return ["" for _ in crops]
+
+        line_images, _, _ = self.ocr_model.text_classifier(line_images)
+        rec_res, _ = self.ocr_model.text_recognizer(line_images)
+
+        drop_score = getattr(self.ocr_model, 'drop_score', 0.5)
+        for crop_index, (text, score) in zip(owners, rec_res):
+            if score >= drop_score:
+                ocr_text_lines[crop_index].append(text)
+        return ['\n'.join(lines) for lines in ocr_text_lines]
+
+
+def extract_text_from_pdf(pdf_path, output_json, progress_queue=None, language='en', use_captioning=False, batch_pages=1, resume=False, use_cache=True, stats=None):
+    try:
+        recognizer = PaddleRecognizer(language=language)
+        cache = OCRCache() if use_cache else None
+        pipeline = OCRPipeline(recognizer, use_captioning=use_captioning, batch_pages=batch_pages, cache=cache)
+        pipeline.run(pdf_path, output_json, progress_queue, resume=resume, stats=stats)
 
     except Exception as e:
         logging.error(f"Error in extract_text_from_pdf: {e}")
-        raise  
+        raise
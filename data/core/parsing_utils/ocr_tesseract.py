@@ -1,96 +1,138 @@
-import json
-import fitz  
-from PIL import Image
 import logging
-import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 import cv2
 import numpy as np
 import pytesseract
-from pytesseract import Output
 
-from data.core.parsing_utils.layout_detection import detect_layout, get_class_name, caption_image  
-
-def extract_text_from_pdf(pdf_path, output_json, progress_queue=None, language='eng', use_captioning=False):
+from data.core.parsing_utils.ocr_cache import OCRCache
+from data.core.parsing_utils.pipeline import OCRPipeline, Recognizer
+
+
+# Page segmentation modes for classes that are read on their own in page mode
+# (7 = single text line). Everything else comes from the one page-level run.
+PSM_BY_CLASS = {'section-header': 7}
+
+
+def _page_words(image, language):
+    return pytesseract.image_to_data(image, lang=language, output_type=pytesseract.Output.DICT)
+
+
+def _read_region(image, language, config):
+    return pytesseract.image_to_string(image, lang=language, config=config)
+
+
+def assign_words_to_regions(words, boxes, min_overlap=0.5):
+    """Groups `image_to_data` words into the regions that contain them.
+
+    A word goes to the region covering most of its box, provided that covers
+    at least `min_overlap` of it. Tesseract's block/paragraph/line numbers
+    keep the reading order and line breaks. Returns one text per region.
+    """
+    keep = [i for i, text in enumerate(words['text']) if text.strip() and float(words['conf'][i]) >= 0]
+    lines = [{} for _ in boxes]
+    if not keep or not boxes:
+        return ["" for _ in boxes]
+
+    left = np.array([words['left'][i] for i in keep], dtype=float)
+    top = np.array([words['top'][i] for i in keep], dtype=float)
+    right = left + np.array([words['width'][i] for i in keep], dtype=float)
+    bottom = top + np.array([words['height'][i] for i in keep], dtype=float)
+    regions = np.array(boxes, dtype=float)
+
+    overlap_w = np.minimum(right[:, None], regions[None, :, 2]) - np.maximum(left[:, None], regions[None, :, 0])
+    overlap_h = np.minimum(bottom[:, None], regions[None, :, 3]) - np.maximum(top[:, None], regions[None, :, 1])
+    overlap = np.clip(overlap_w, 0, None) * np.clip(overlap_h, 0, None)
+    word_area = np.maximum((right - left) * (bottom - top), 1)
+    best = overlap.argmax(axis=1)
+    covered = overlap[np.arange(len(keep)), best] >= min_overlap * word_area
+
+    for position, i in enumerate(keep):
+        if covered[position]:
+            line_key = (words['block_num'][i], words['par_num'][i], words['line_num'][i])
+            lines[best[position]].setdefault(line_key, []).append(words['text'][i].strip())
+    return ["\n".join(" ".join(line) for line in region_lines.values()) for region_lines in lines]
+
+
+class TesseractRecognizer(Recognizer):
+    """Tesseract OCR, either one call per text region or, with `page_mode`,
+    one `image_to_data` call per page whose words are assigned to the regions.
+    """
+    name = "tesseract"
+
+    def __init__(self, language='eng', workers=1, page_mode=False):
+        self.language = language
+        self.version = str(pytesseract.get_tesseract_version())
+        self.workers = workers
+        self.whole_page = page_mode
+        self._executor = None
+        if workers > 1:
+            # Spawned, not forked: the pool starts while the pipeline and Tk threads are running.
+            self._executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            logging.debug(f"Tesseract running on {workers} worker processes")
+
+    def recognize(self, cropped_image, class_name):
+        cropped_image_rgb = cv2.cvtColor(cropped_image, cv2.COLOR_BGR2RGB)
+        return pytesseract.image_to_string(cropped_image_rgb, lang=self.language)
+
+    def recognize_batch(self, crops):
+        if self._executor is None:
+            return super().recognize_batch(crops)
+        images = [cv2.cvtColor(cropped_image, cv2.COLOR_BGR2RGB) for cropped_image, _ in crops]
+        # map() yields results in submission order, so detections keep their page order.
+        return list(self._executor.map(pytesseract.image_to_string, images, repeat(self.language)))
+
+    def _map(self, function, *iterables):
+        if self._executor is None:
+            return list(map(function, *iterables))
+        return list(self._executor.map(function, *iterables))
+
+    def recognize_page(self, page_image, regions):
+        return self.recognize_pages([(page_image, regions)])[0]
+
+    def recognize_pages(self, pages):
+        images = [cv2.cvtColor(page_image, cv2.COLOR_BGR2RGB) for page_image, _ in pages]
+        page_words = self._map(_page_words, images, repeat(self.language))
+        page_texts = [
+            assign_words_to_regions(words, [bbox for bbox, _ in regions])
+            for words, (_, regions) in zip(page_words, pages)
+        ]
+
+        # Classes with their own segmentation mode are re-read from their crop.
+        jobs = []
+        for page_index, (_, regions) in enumerate(pages):
+            for region_index, (bbox, class_name) in enumerate(regions):
+                psm = PSM_BY_CLASS.get(class_name.lower())
+                if psm is not None:
+                    xmin, ymin, xmax, ymax = bbox
+                    crop = images[page_index][ymin:ymax, xmin:xmax]
+                    if crop.size:
+                        jobs.append((page_index, region_index, crop, f"--psm {psm}"))
+        if jobs:
+            texts = self._map(_read_region, [crop for _, _, crop, _ in jobs], repeat(self.language), [config for _, _, _, config in jobs])
+            for (page_index, region_index, _, _), text in zip(jobs, texts):
+                page_texts[page_index][region_index] = text
+        logging.debug(f"Tesseract page mode: {len(pages)} page runs, {len(jobs)} single-region runs")
+        return page_texts
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+
+def extract_text_from_pdf(pdf_path, output_json, progress_queue=None, language='eng', use_captioning=False, workers=1, batch_pages=1, resume=False, use_cache=True, stats=None, page_mode=False):
+    recognizer = None
     try:
-        logging.debug(f"Starting OCR on {pdf_path}")
-        doc = fitz.open(pdf_path)
-        data = []
-        num_pages = len(doc)
-        total_tasks = num_pages  
-
-        for page_num in range(num_pages):
-            page = doc.load_page(page_num)
-            pix = page.get_pixmap()
-            img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-
-            
-            image = np.array(img)
-            image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
-
-            
-            detections = detect_layout(image)
-
-            if detections is None or len(detections) == 0:
-                logging.warning(f"No detections for page {page_num + 1}")
-                detections = sv.Detections.empty()
-
-            page_data = {
-                'page': page_num + 1,
-                'detections': []
-            }
-
-            num_detections = len(detections)
-            for i in range(num_detections):
-                class_id = detections.class_id[i]
-                class_name = get_class_name(class_id)
-                bbox = detections.xyxy[i]  
-                xmin, ymin, xmax, ymax = map(int, bbox)
-
-                xmin = max(0, xmin - 3)
-                ymin = max(0, ymin - 3)
-                xmax = min(image.shape[1], xmax + 3)
-                ymax = min(image.shape[0], ymax + 3)
-
-                cropped_image = image[ymin:ymax, xmin:xmax]
-
-                if class_name.lower() in ['text', 'section-header']:
-                    
-                    cropped_image_rgb = cv2.cvtColor(cropped_image, cv2.COLOR_BGR2RGB)
-                    text = pytesseract.image_to_string(cropped_image_rgb, lang=language)
-                    ocr_text = text
-                elif class_name.lower() in ['image', 'picture']:
-                    if use_captioning:
-                        cropped_image_pil = Image.fromarray(cv2.cvtColor(cropped_image, cv2.COLOR_BGR2RGB))
-                        ocr_text = caption_image(cropped_image_pil)
-                    else:
-                        ocr_text = ""
-                else:
-                    ocr_text = ""
-
-                detection_data = {
-                    'class': class_name,
-                    'bbox': [xmin, ymin, xmax, ymax],
-                    'text': ocr_text
-                }
-                page_data['detections'].append(detection_data)
-
-            data.append(page_data)
-
-            if progress_queue:
-                progress_queue.put((page_num + 1) / total_tasks)
-
-        doc.close()
-
-        
-        json_output = {
-            "metadata": {},
-            "pages": data
-        }
-
-        with open(output_json, 'w', encoding='utf-8') as json_file:
-            json.dump(json_output, json_file, indent=4, ensure_ascii=False)
-        logging.debug(f"JSON saved successfully to {output_json}")
+        recognizer = TesseractRecognizer(language=language, workers=workers, page_mode=page_mode)
+        cache = OCRCache() if use_cache else None
+        pipeline = OCRPipeline(recognizer, use_captioning=use_captioning, batch_pages=batch_pages, cache=cache)
+        pipeline.run(pdf_path, output_json, progress_queue, resume=resume, stats=stats)
 
     except Exception as e:
         logging.error(f"Error in extract_text_from_pdf: {e}")
-        raise  
+        raise
+    finally:
+        if recognizer is not None:
+            recognizer.close()
@@ -0,0 +1,826 @@
+import hashlib
+import json
+import logging
+import queue
+import threading
+import time
+from collections import deque
+
+import cv2
+import fitz
+import numpy as np
+import supervision as sv
+from PIL import Image
+
+from data.core.parsing_utils.checkpoint import PageCheckpoint
+from data.core.parsing_utils.json_writer import StreamingJSONWriter
+from data.core.parsing_utils.ocr_cache import OCRCache
+from data.core.parsing_utils.run_stats import RunStats
+from data.core.parsing_utils.layout_detection import detect_layout_batch, get_class_name, caption_images
+
+TEXT_CLASSES = ['text', 'section-header']
+PICTURE_CLASSES = ['image', 'picture']
+
+# Running headers and footers, recognized once per distinct look when enabled.
+FURNITURE_CLASSES = ['page-header', 'page-footer']
+
+ROUTE_TEXT = 'text'
+ROUTE_PICTURE = 'picture'
+ROUTE_FURNITURE = 'furniture'
+ROUTE_OTHER = 'other'
+
+_DONE = object()
+
+
+class Recognizer:
+    """Base class for OCR backends plugged into OCRPipeline.
+
+    Backends that read a whole page in one call set `whole_page` and
+    implement `recognize_page`; the pipeline then hands them the page at
+    OCR resolution with the text regions instead of one crop per region.
+    """
+    name = "recognizer"
+    version = ""
+    language = ""
+    whole_page = False
+
+    def recognize(self, cropped_image, class_name):
+        raise NotImplementedError
+
+    def recognize_batch(self, crops):
+        return [self.recognize(cropped_image, class_name) for cropped_image, class_name in crops]
+
+    def recognize_page(self, page_image, regions):
+        # `regions` are (bbox in page_image pixels, class_name); returns one text per region.
+        raise NotImplementedError
+
+    def recognize_pages(self, pages):
+        return [self.recognize_page(page_image, regions) for page_image, regions in pages]
+
+    def close(self):
+        pass
+
+
+def native_page_detections(page, min_chars=50, max_image_cover=0.9):
+    """Builds detections from the PDF's own text layer, or returns None.
+
+    Pages whose visible text has fewer than `min_chars` readable characters
+    are treated as image-only and go through layout detection and OCR
+    instead. So are pages with invisible text (render mode 3, the OCR layer
+    of a scanned PDF) and pages where one image covers more than
+    `max_image_cover` of the page.
+    Bboxes are in page points, the same space as the default 72 dpi render;
+    on pages with /Rotate they are mapped into the rotated page.
+    """
+    readable_chars = 0
+    for span in page.get_texttrace():
+        chars = sum(1 for char in span['chars'] if chr(char[0]).isalnum())
+        # Type 3 is text that is not painted, such as the OCR layer over a scan.
+        # get_text cannot leave it out, so such pages are OCRed.
+        if span['type'] == 3 and chars:
+            return None
+        readable_chars += chars
+    if readable_chars < min_chars:
+        return None
+
+    page_rect = page.rect
+    page_area = abs(page_rect) or 1
+    # get_text and get_image_info give unrotated coordinates; the render and the GUI use rotated ones.
+    rotation = page.rotation_matrix
+    image_bboxes = [fitz.Rect(info['bbox']) * rotation for info in page.get_image_info()]
+    if any(abs(bbox & page_rect) / page_area > max_image_cover for bbox in image_bboxes):
+        return None
+
+    # Without TEXT_PRESERVE_IMAGES the image bytes are not extracted; their bboxes come from get_image_info.
+    page_dict = page.get_text("dict", flags=fitz.TEXTFLAGS_DICT & ~fitz.TEXT_PRESERVE_IMAGES, sort=True)
+    text_blocks = []
+    for block in page_dict.get('blocks', []):
+        lines = []
+        font_size = 0
+        for line in block.get('lines', []):
+            spans = line.get('spans', [])
+            line_text = "".join(span.get('text', "") for span in spans)
+            if line_text.strip():
+                lines.append(line_text)
+                font_size = max([font_size] + [span.get('size', 0) for span in spans])
+        if lines:
+            text_blocks.append((fitz.Rect(block['bbox']) * rotation, "\n".join(lines), font_size, len(lines)))
+    if not text_blocks:
+        return None
+
+    # Short blocks set noticeably larger than the body text are taken as headings.
+    sizes = sorted(font_size for _, _, font_size, _ in text_blocks)
+    body_size = sizes[len(sizes) // 2]
+
+    detections = []
+    for bbox, text, font_size, line_count in text_blocks:
+        if font_size >= body_size * 1.3 and line_count <= 2:
+            class_name = 'Section-header'
+        else:
+            class_name = 'Text'
+        detections.append({
+            'class': class_name,
+            'bbox': _clip_bbox(bbox, page_rect),
+            'text': text
+        })
+    for bbox in image_bboxes:
+        detections.append({
+            'class': 'Picture',
+            'bbox': _clip_bbox(bbox, page_rect),
+            'text': ""
+        })
+    return detections
+
+
+def _clip_bbox(bbox, page_rect):
+    xmin, ymin, xmax, ymax = bbox
+    return [
+        max(0, int(xmin)),
+        max(0, int(ymin)),
+        min(int(page_rect.width), int(np.ceil(xmax))),
+        min(int(page_rect.height), int(np.ceil(ymax))),
+    ]
+
+
+def class_route(class_name):
+    if class_name.lower() in TEXT_CLASSES:
+        return ROUTE_TEXT
+    if class_name.lower() in PICTURE_CLASSES:
+        return ROUTE_PICTURE
+    return ROUTE_OTHER
+
+
+def route_detections(detections, class_info, scale, page_width, page_height, pad=3):
+    """Scales, pads and clips a page's boxes and groups them by downstream stage.
+
+    Works on the whole `detections.xyxy` / `class_id` arrays at once;
+    `class_info(class_id)` returns (class_name, route) and is called once per
+    distinct class on the page. Returns the boxes in page points as lists,
+    the class name of each box, and a dict mapping each route present on the
+    page to the indices of its boxes in detection order.
+    """
+    if len(detections) == 0:
+        return [], [], {}
+
+    boxes = (detections.xyxy * scale).astype(int)
+    boxes[:, :2] = np.maximum(boxes[:, :2] - pad, 0)
+    boxes[:, 2] = np.minimum(boxes[:, 2] + pad, page_width)
+    boxes[:, 3] = np.minimum(boxes[:, 3] + pad, page_height)
+
+    class_ids, inverse = np.unique(detections.class_id, return_inverse=True)
+    info = [class_info(class_id) for class_id in class_ids.tolist()]
+    class_names = [info[index][0] for index in inverse.tolist()]
+    routes = np.array([route for _, route in info])[inverse]
+    groups = {route: np.flatnonzero(routes == route).tolist() for route in set(route for _, route in info)}
+    return boxes.tolist(), class_names, groups
+
+
+def dhash(image, width=64, height=8, tolerance=8, ink_level=160):
+    """Difference hash of a crop, used to spot repeated page furniture.
+
+    The crop is first trimmed to its inked area (pixels darker than
+    `ink_level`), so a short page number in a wide footer still fills the
+    hash. It is then shrunk to `height` rows of `width + 1` grey cells and
+    each cell is compared with its right neighbour. Differences within
+    `tolerance` grey levels count as equal, so scanner noise hashes the same
+    on every page. The trimmed size is part of the hash.
+    """
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    rows = np.flatnonzero((gray < ink_level).any(axis=1))
+    cols = np.flatnonzero((gray < ink_level).any(axis=0))
+    if len(rows) == 0:
+        return "blank"
+    ink = gray[rows[0]:rows[-1] + 1, cols[0]:cols[-1] + 1]
+    small = cv2.resize(ink, (width + 1, height), interpolation=cv2.INTER_AREA).astype(np.int16)
+    difference = small[:, :-1] - small[:, 1:]
+    bits = np.concatenate([difference > tolerance, difference < -tolerance])
+    # Sizes are coarsened so a pixel of jitter between scans does not matter.
+    return f"{ink.shape[1] // 8}x{ink.shape[0] // 8}:{np.packbits(bits).tobytes().hex()}"
+
+
+def pixmap_to_image(pix):
+    img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+    image = np.array(img)
+    return cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+
+
+def render_page(page, dpi=72):
+    return pixmap_to_image(page.get_pixmap(dpi=dpi))
+
+
+def page_content_hash(page):
+    """Hash of what a page draws, without rendering it.
+
+    Covers the page size and rotation, its content stream and the raw
+    (still encoded) bytes of the images and form XObjects it uses, so a
+    rescan or an edited text layer changes it but re-running the pipeline
+    at another dpi does not.
+    """
+    doc = page.parent
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{tuple(page.rect)}|{page.rotation}".encode('ascii'))
+    digest.update(page.read_contents())
+    xrefs = [xref for xref, *_ in page.get_xobjects()]
+    for image in page.get_images(full=True):
+        # The image and its soft mask, if it has one.
+        xrefs.extend(xref for xref in image[:2] if xref)
+    for xref in dict.fromkeys(xrefs):
+        digest.update(doc.xref_stream_raw(xref) or b"")
+    return digest.hexdigest()
+
+
+def detections_hash(detections):
+    """Hash of the editable content of a page's detections.
+
+    Keys the GUI adds on load (`id`, default `name`s) are left out, so the
+    hash only changes when a region, its class or its text was edited.
+    """
+    content = []
+    for detection in detections:
+        entry = {key: value for key, value in detection.items() if key not in ('id', 'name')}
+        name = detection.get('name')
+        if name is not None and name != detection.get('text') and not str(name).startswith('image_'):
+            entry['name'] = name
+        content.append(entry)
+    return hashlib.blake2b(json.dumps(content, sort_keys=True, ensure_ascii=False).encode('utf-8'), digest_size=16).hexdigest()
+
+
+class CaptionWorker:
+    """Captions Picture crops on a background thread, in batches.
+
+    Crops are queued while the pipeline keeps recognizing later pages; the
+    worker drains whatever is waiting (up to `batch_size`) into one batched
+    captioning call and writes the captions into the queued detections.
+    """
+
+    def __init__(self, batch_size=8, max_queued=64, stats=None, caption_batch=None):
+        self.batch_size = max(1, batch_size)
+        self.stats = stats
+        self.caption_batch = caption_batch or caption_images
+        self._queue = queue.Queue(maxsize=max_queued)
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._failed = set()
+        self._thread = threading.Thread(target=self._run, name="ocr-caption", daemon=True)
+        self.errors = []
+
+    def start(self):
+        self._thread.start()
+
+    def submit(self, page_number, detection_data, image):
+        with self._lock:
+            self._pending[page_number] = self._pending.get(page_number, 0) + 1
+        self._queue.put((page_number, detection_data, image))
+
+    def pending(self, page_number):
+        with self._lock:
+            return self._pending.get(page_number, 0)
+
+    def failed(self, page_number):
+        """True if captioning any of the page's crops failed."""
+        with self._lock:
+            return page_number in self._failed
+
+    def close(self):
+        self._queue.put(_DONE)
+        self._thread.join()
+
+    def _run(self):
+        done = False
+        while not done:
+            item = self._queue.get()
+            if item is _DONE:
+                break
+            batch = [item]
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _DONE:
+                    done = True
+                    break
+                batch.append(item)
+
+            try:
+                start = time.perf_counter()
+                captions = self.caption_batch([image for _, _, image in batch])
+                if self.stats is not None:
+                    self.stats.split(time.perf_counter() - start, [
+                        ('caption', page_number, image.width * image.height, 1, image.width * image.height * 3)
+                        for page_number, _, image in batch
+                    ])
+                for (_, detection_data, _), caption in zip(batch, captions):
+                    detection_data['text'] = caption
+            except Exception as e:
+                logging.error(f"Caption stage failed: {e}")
+                self.errors.append(e)
+                with self._lock:
+                    self._failed.update(page_number for page_number, _, _ in batch)
+            finally:
+                with self._lock:
+                    for page_number, _, _ in batch:
+                        self._pending[page_number] -= 1
+                        if self._pending[page_number] == 0:
+                            del self._pending[page_number]
+
+
+class OCRPipeline:
+    """Runs rendering, layout detection and recognition as overlapping stages.
+
+    Rendering and layout detection each run on their own thread and hand pages
+    downstream through bounded queues, so page N+1 is rendered and laid out
+    while page N is being recognized on the calling thread. The layout stage
+    feeds up to `layout_batch_size` pages to the detector in one forward pass.
+    Text crops of up to `batch_pages` pages are handed to the recognizer in a
+    single `recognize_batch` call so parallel backends can spread them over
+    workers.
+    Picture crops go to a CaptionWorker; a page is emitted once all of its
+    captions are in, so pages still come out in order.
+
+    Layout runs on a cheap `layout_dpi` render of the page. Each text region
+    is then rendered again on its own at `ocr_dpi` (PyMuPDF `clip=`), so only
+    the regions being read are rasterized at high resolution. Bboxes in the
+    output are always in page points, as the GUI expects.
+
+    Emitted pages are appended to a PageCheckpoint next to the output file
+    and streamed into the output JSON straight away; no page is kept in
+    memory once it has been written. With `resume=True` the pages already in
+    the checkpoint are skipped and copied from it into the output, provided
+    they are part of this run's `pages` and their `content_hash` still
+    matches the PDF. Pages whose captions failed are not checkpointed.
+
+    `pages` limits the run to the given 1-based page numbers; the output then
+    holds only those pages (see reprocess.py for merging them into an
+    existing JSON). Every page records a `content_hash` of its PDF content
+    and a `detections_hash` of its detections, so later runs can tell pages
+    whose PDF content changed from pages edited by hand.
+
+    Stage timings, crop counts and bytes are collected in a RunStats (pass
+    one in to watch them live) and written to `<output>.report.json`.
+
+    When an OCRCache is given, crops already recognized by the same engine
+    version and language are served from it instead of the recognizer.
+
+    With `use_text_layer` pages that already carry a usable text layer are
+    taken from the PDF directly and skip rasterization, layout and OCR.
+
+    Classes in `furniture_classes` (e.g. FURNITURE_CLASSES) are recognized
+    like text, but only once per distinct dHash of their crop; repeats on
+    later pages reuse that text. Classes in `skip_classes` are kept in the
+    output without being cropped or recognized.
+
+    `layout_detector` (detect_layout_batch, get_class_name) and
+    `captioning_model` (caption_batch) replace the shared models from
+    layout_detection, e.g. with the stub engines in benchmarks/.
+    """
+
+    def __init__(self, recognizer, use_captioning=False, queue_size=2, batch_pages=1, layout_batch_size=4,
+                 caption_batch_size=8, cache=None, use_text_layer=True, min_text_chars=50,
+                 layout_dpi=72, ocr_dpi=300, layout_detector=None, captioning_model=None,
+                 furniture_classes=(), skip_classes=()):
+        self.recognizer = recognizer
+        self.furniture_classes = [class_name.lower() for class_name in furniture_classes]
+        self.skip_classes = [class_name.lower() for class_name in skip_classes]
+        self._detect_layout_batch = layout_detector.detect_layout_batch if layout_detector else detect_layout_batch
+        self._get_class_name = layout_detector.get_class_name if layout_detector else get_class_name
+        self._caption_batch = captioning_model.caption_batch if captioning_model else caption_images
+        self.cache = cache
+        self.use_text_layer = use_text_layer
+        self.min_text_chars = min_text_chars
+        self.use_captioning = use_captioning
+        self.caption_batch_size = caption_batch_size
+        self.queue_size = max(queue_size, batch_pages, layout_batch_size)
+        self.batch_pages = max(1, batch_pages)
+        self.layout_batch_size = max(1, layout_batch_size)
+        self.layout_dpi = layout_dpi
+        self.ocr_dpi = ocr_dpi
+        self._stop = threading.Event()
+        self._errors = []
+        self._captioner = None
+        self._stats = None
+        self._class_info = {}
+        self._furniture_texts = {}
+        # MuPDF is not thread-safe; every access to the open document goes through this lock.
+        self._doc_lock = threading.Lock()
+
+    def run(self, pdf_path, output_json, progress_queue=None, resume=False, pages=None, stats=None, report_path=None):
+        logging.debug(f"Starting OCR on {pdf_path}")
+        self._stats = stats = stats if stats is not None else RunStats()
+        self._furniture_texts = {}
+        doc = fitz.open(pdf_path)
+        num_pages = len(doc)
+        if pages is None:
+            selected = range(num_pages)
+        else:
+            selected = sorted({page - 1 for page in pages if 0 < page <= num_pages})
+        total_tasks = len(selected)
+
+        checkpoint = PageCheckpoint(output_json)
+        finished_pages = deque(self._reusable_pages(doc, checkpoint, selected) if resume else [])
+        if finished_pages:
+            logging.debug(f"Resuming {pdf_path}: {len(finished_pages)} of {total_tasks} pages already done")
+        checkpoint.open(resume=resume)
+        skipped = set(finished_pages)
+        page_numbers = [page_num for page_num in selected if page_num + 1 not in skipped]
+        completed = len(finished_pages)
+        writer = StreamingJSONWriter(output_json)
+        writer.open()
+
+        self._stop.clear()
+        self._errors = []
+        rendered = queue.Queue(maxsize=self.queue_size)
+        prepared = queue.Queue(maxsize=self.queue_size)
+        stages = [
+            threading.Thread(target=self._render_stage, args=(doc, page_numbers, rendered), name="ocr-render", daemon=True),
+            threading.Thread(target=self._layout_stage, args=(doc, rendered, prepared), name="ocr-layout", daemon=True),
+        ]
+        for stage in stages:
+            stage.start()
+
+        self._captioner = None
+        if self.use_captioning:
+            self._captioner = CaptionWorker(batch_size=self.caption_batch_size, stats=stats, caption_batch=self._caption_batch)
+            self._captioner.start()
+
+        waiting = deque()
+
+        def write_finished_pages(before_page):
+            while finished_pages and finished_pages[0] < before_page:
+                writer.write_page(checkpoint.read(finished_pages.popleft()))
+
+        def emit_ready_pages():
+            nonlocal completed
+            while waiting and (self._captioner is None or self._captioner.pending(waiting[0]['page']) == 0):
+                page_data = waiting.popleft()
+                page_data['detections_hash'] = detections_hash(page_data['detections'])
+                with stats.timer('serialize', page_data['page'], count=1):
+                    if self._captioner is not None and self._captioner.failed(page_data['page']):
+                        # Left out of the checkpoint so a resumed run captions the page again.
+                        logging.warning(f"Not checkpointing page {page_data['page']}: captioning failed")
+                    else:
+                        checkpoint.append(page_data)
+                    write_finished_pages(page_data['page'])
+                    writer.write_page(page_data)
+                stats.page_done()
+                completed += 1
+                if progress_queue:
+                    progress_queue.put(completed / total_tasks)
+
+        succeeded = False
+        try:
+            done = False
+            while not done:
+                batch = []
+                while len(batch) < self.batch_pages:
+                    item = self._get(prepared)
+                    if item is _DONE:
+                        done = True
+                        break
+                    batch.append(item)
+                waiting.extend(self._recognize_pages(batch))
+                emit_ready_pages()
+            succeeded = True
+        finally:
+            self._stop.set()
+            for stage in stages:
+                stage.join()
+            if self._captioner is not None:
+                self._captioner.close()
+                self._errors.extend(self._captioner.errors)
+            # Keep whatever finished before a failure so a resumed run can skip it.
+            emit_ready_pages()
+            checkpoint.close()
+            doc.close()
+            if not succeeded or self._errors:
+                writer.abort()
+
+        if self._errors:
+            raise self._errors[0]
+
+        with stats.timer('serialize'):
+            write_finished_pages(float('inf'))
+            writer.close()
+        checkpoint.remove()
+        stats.finish()
+        stats.write_report(report_path or output_json + ".report.json", pdf=pdf_path, output=output_json,
+                           engine=self.recognizer.name, pages_total=total_tasks)
+        logging.debug(f"JSON saved successfully to {output_json}")
+        return stats
+
+    def _reusable_pages(self, doc, checkpoint, selected):
+        """Checkpointed page numbers that belong to this run and still match the PDF."""
+        wanted = {page_num + 1 for page_num in selected}
+        reusable = []
+        stale = 0
+        for page_number in checkpoint.load():
+            if page_number not in wanted:
+                continue
+            if checkpoint.read(page_number).get('content_hash') != page_content_hash(doc.load_page(page_number - 1)):
+                stale += 1
+                continue
+            reusable.append(page_number)
+        if stale:
+            logging.warning(f"{stale} checkpointed pages no longer match {doc.name}; they are processed again")
+        return reusable
+
+    def _put(self, q, item):
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q):
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _render_stage(self, doc, page_numbers, out_queue):
+        try:
+            stats = self._stats
+            for page_num in page_numbers:
+                with self._doc_lock:
+                    page = doc.load_page(page_num)
+                    native = None
+                    if self.use_text_layer:
+                        with stats.timer('text_layer', page_num + 1):
+                            native = native_page_detections(page, self.min_text_chars)
+                    content_hash = page_content_hash(page)
+                    image = None
+                    # Only Picture crops for captioning need the pixels of a text-layer page.
+                    if native is None or any(self._captioned(detection_data) for detection_data in native):
+                        start = time.perf_counter()
+                        image = render_page(page, self.layout_dpi)
+                if image is not None:
+                    stats.add('rasterize', time.perf_counter() - start, page_num + 1, count=1, nbytes=image.nbytes)
+                if not self._put(out_queue, (page_num, image, native, content_hash)):
+                    return
+        except Exception as e:
+            logging.error(f"Page rendering failed: {e}")
+            self._errors.append(e)
+        finally:
+            self._put(out_queue, _DONE)
+
+    def _layout_stage(self, doc, in_queue, out_queue):
+        try:
+            done = False
+            while not done:
+                batch = []
+                while len(batch) < self.layout_batch_size:
+                    item = self._get(in_queue)
+                    if item is _DONE:
+                        done = True
+                        break
+                    batch.append(item)
+                if not batch:
+                    return
+
+                scanned = [(page_num, image) for page_num, image, native, _ in batch if native is None]
+                batch_detections = []
+                if scanned:
+                    start = time.perf_counter()
+                    batch_detections = self._detect_layout_batch([image for _, image in scanned])
+                    self._stats.split(time.perf_counter() - start, [
+                        ('layout', page_num + 1, 1, 1, image.nbytes) for page_num, image in scanned
+                    ])
+                batch_detections = iter(batch_detections)
+                for page_num, image, native, content_hash in batch:
+                    if native is not None:
+                        prepared = self._prepare_native_page(page_num, image, native)
+                    else:
+                        detections = next(batch_detections)
+                        if detections is None or len(detections) == 0:
+                            logging.warning(f"No detections for page {page_num + 1}")
+                            detections = sv.Detections.empty()
+                        prepared = self._prepare_page(doc, page_num, image, detections)
+                    prepared[0]['content_hash'] = content_hash
+                    if not self._put(out_queue, prepared):
+                        return
+        except Exception as e:
+            logging.error(f"Layout stage failed: {e}")
+            self._errors.append(e)
+        finally:
+            self._put(out_queue, _DONE)
+
+    def _route_class(self, class_id):
+        if class_id not in self._class_info:
+            class_name = self._get_class_name(class_id)
+            if class_name.lower() in self.skip_classes:
+                route = ROUTE_OTHER
+            elif class_name.lower() in self.furniture_classes:
+                route = ROUTE_FURNITURE
+            else:
+                route = class_route(class_name)
+            self._class_info[class_id] = (class_name, route)
+        return self._class_info[class_id]
+
+    def _captioned(self, detection_data):
+        """True if a text-layer detection is captioned, as _route_class decides for scanned pages."""
+        class_name = detection_data['class']
+        return (self.use_captioning and class_name.lower() not in self.skip_classes
+                and class_route(class_name) == ROUTE_PICTURE)
+
+    def _layout_crop(self, image, bbox):
+        zoom = self.layout_dpi / 72
+        xmin, ymin, xmax, ymax = (int(round(v * zoom)) for v in bbox)
+        return image[ymin:ymax, xmin:xmax]
+
+    def _picture_crop(self, image, bbox):
+        cropped_image = self._layout_crop(image, bbox)
+        if cropped_image.size == 0:
+            return None
+        return Image.fromarray(cv2.cvtColor(cropped_image, cv2.COLOR_BGR2RGB))
+
+    def _prepare_native_page(self, page_num, image, detections):
+        page_data = {
+            'page': page_num + 1,
+            'detections': detections
+        }
+        picture_work = []
+        if image is not None:
+            for detection_data in detections:
+                if self._captioned(detection_data):
+                    cropped_image_pil = self._picture_crop(image, detection_data['bbox'])
+                    if cropped_image_pil is not None:
+                        picture_work.append((detection_data, cropped_image_pil))
+        return page_data, [], picture_work, None, []
+
+    def _prepare_page(self, doc, page_num, image, detections):
+        page_data = {
+            'page': page_num + 1,
+            'detections': []
+        }
+        text_work = []
+        picture_work = []
+        page_regions = []
+        whole_page = self.recognizer.whole_page
+
+        with self._doc_lock:
+            page = doc.load_page(page_num)
+            page_width, page_height = int(page.rect.width), int(page.rect.height)
+        scale = 72 / self.layout_dpi
+
+        boxes, class_names, groups = route_detections(detections, self._route_class, scale, page_width, page_height)
+        page_data['detections'] = [
+            {'class': class_name, 'bbox': bbox, 'text': ""} for class_name, bbox in zip(class_names, boxes)
+        ]
+
+        for i in groups.get(ROUTE_TEXT, []):
+            detection_data = page_data['detections'][i]
+            class_name = class_names[i]
+            if whole_page:
+                page_regions.append((detection_data, class_name))
+                continue
+            text_work.append((detection_data, self._ocr_crop(page, page_num, image, boxes[i]), class_name))
+
+        furniture_work = []
+        for i in groups.get(ROUTE_FURNITURE, []):
+            cropped_image = self._ocr_crop(page, page_num, image, boxes[i])
+            if cropped_image.size == 0:
+                continue
+            variant = (class_names[i], dhash(cropped_image))
+            furniture_work.append((page_data['detections'][i], cropped_image, class_names[i], variant))
+
+        if self.use_captioning:
+            for i in groups.get(ROUTE_PICTURE, []):
+                cropped_image_pil = self._picture_crop(image, boxes[i])
+                if cropped_image_pil is not None:
+                    picture_work.append((page_data['detections'][i], cropped_image_pil))
+
+        page_work = None
+        if page_regions:
+            if self.ocr_dpi == self.layout_dpi:
+                page_image = image
+            else:
+                start = time.perf_counter()
+                with self._doc_lock:
+                    page_image = render_page(page, self.ocr_dpi)
+                self._stats.add('rasterize', time.perf_counter() - start, page_num + 1, count=1, nbytes=page_image.nbytes)
+            zoom = self.ocr_dpi / 72
+            regions = [
+                ([int(round(v * zoom)) for v in detection_data['bbox']], class_name)
+                for detection_data, class_name in page_regions
+            ]
+            page_work = (page_image, regions, [detection_data for detection_data, _ in page_regions])
+
+        return page_data, text_work, picture_work, page_work, furniture_work
+
+    def _ocr_crop(self, page, page_num, image, bbox):
+        if self.ocr_dpi == self.layout_dpi:
+            return self._layout_crop(image, bbox)
+        start = time.perf_counter()
+        with self._doc_lock:
+            pix = page.get_pixmap(dpi=self.ocr_dpi, clip=fitz.Rect(bbox))
+        cropped_image = pixmap_to_image(pix)
+        self._stats.add('rasterize', time.perf_counter() - start, page_num + 1, count=1, nbytes=cropped_image.nbytes)
+        return cropped_image
+
+    def _recognize_pages(self, batch):
+        if self._captioner is not None:
+            for page_data, _, picture_work, _, _ in batch:
+                for detection_data, cropped_image_pil in picture_work:
+                    self._captioner.submit(page_data['page'], detection_data, cropped_image_pil)
+
+        text_work = [
+            (page_data['page'], work) for page_data, page_text_work, _, _, _ in batch for work in page_text_work
+        ]
+        if text_work:
+            start = time.perf_counter()
+            texts = self._recognize_text([(cropped_image, class_name) for _, (_, cropped_image, class_name) in text_work])
+            self._stats.split(time.perf_counter() - start, [
+                (f"ocr:{class_name}", page_number, cropped_image.shape[0] * cropped_image.shape[1], 1, cropped_image.nbytes)
+                for page_number, (_, cropped_image, class_name) in text_work
+            ])
+            for (_, (detection_data, _, _)), ocr_text in zip(text_work, texts):
+                detection_data['text'] = ocr_text
+
+        page_work = [(page_data['page'], work) for page_data, _, _, work, _ in batch if work is not None]
+        if page_work:
+            start = time.perf_counter()
+            page_texts = self._recognize_whole_pages([(page_image, regions) for _, (page_image, regions, _) in page_work])
+            shares = []
+            for page_number, (page_image, regions, _) in page_work:
+                for (xmin, ymin, xmax, ymax), class_name in regions:
+                    area = max(0, xmax - xmin) * max(0, ymax - ymin)
+                    shares.append((f"ocr:{class_name}", page_number, area, 1, area * page_image.shape[2]))
+            self._stats.split(time.perf_counter() - start, shares)
+            for (_, (_, _, detections)), texts in zip(page_work, page_texts):
+                for detection_data, ocr_text in zip(detections, texts):
+                    detection_data['text'] = ocr_text
+
+        furniture_work = [
+            (page_data['page'], work) for page_data, _, _, _, page_furniture in batch for work in page_furniture
+        ]
+        if furniture_work:
+            self._recognize_furniture(furniture_work)
+
+        return [page_data for page_data, _, _, _, _ in batch]
+
+    def _recognize_furniture(self, furniture_work):
+        # Only the first crop of each variant in the document is recognized; repeats reuse its text.
+        new_variants = {}
+        for page_number, (_, cropped_image, class_name, variant) in furniture_work:
+            if variant not in self._furniture_texts and variant not in new_variants:
+                new_variants[variant] = (page_number, cropped_image, class_name)
+        if new_variants:
+            start = time.perf_counter()
+            texts = self._recognize_text([(cropped_image, class_name) for _, cropped_image, class_name in new_variants.values()])
+            self._stats.split(time.perf_counter() - start, [
+                (f"ocr:{class_name}", page_number, cropped_image.shape[0] * cropped_image.shape[1], 1, cropped_image.nbytes)
+                for page_number, cropped_image, class_name in new_variants.values()
+            ])
+            self._furniture_texts.update(zip(new_variants, texts))
+        self._stats.add('furniture_reused', 0.0, count=len(furniture_work) - len(new_variants))
+        for _, (detection_data, _, _, variant) in furniture_work:
+            detection_data['text'] = self._furniture_texts[variant]
+
+    def _recognize_text(self, text_crops):
+        if self.cache is None:
+            return self.recognizer.recognize_batch(text_crops)
+
+        recognizer = self.recognizer
+        keys = [
+            OCRCache.make_key(cropped_image, recognizer.name, recognizer.version, recognizer.language, class_name)
+            for cropped_image, class_name in text_crops
+        ]
+        cached = self.cache.get_many(keys)
+        missing = [i for i, key in enumerate(keys) if key not in cached]
+        logging.debug(f"OCR cache: {len(keys) - len(missing)} hits, {len(missing)} misses")
+        self._stats.add('ocr_cache_hits', 0.0, count=len(keys) - len(missing))
+
+        if missing:
+            texts = recognizer.recognize_batch([text_crops[i] for i in missing])
+            new_entries = {keys[i]: text for i, text in zip(missing, texts)}
+            # Empty results are not stored, so a transient engine failure is retried next run.
+            self.cache.put_many([(key, text) for key, text in new_entries.items() if text])
+            cached.update(new_entries)
+        return [cached[key] for key in keys]
+
+    def _recognize_whole_pages(self, pages):
+        if self.cache is None:
+            return self.recognizer.recognize_pages(pages)
+
+        # A page entry is keyed by the page pixels plus its regions and stores the texts as a JSON list.
+        recognizer = self.recognizer
+        keys = [
+            OCRCache.make_key(page_image, recognizer.name, recognizer.version, recognizer.language,
+                              "page|" + json.dumps(regions))
+            for page_image, regions in pages
+        ]
+        cached = {key: json.loads(texts) for key, texts in self.cache.get_many(keys).items()}
+        missing = [i for i, key in enumerate(keys) if key not in cached]
+        logging.debug(f"OCR cache: {len(keys) - len(missing)} page hits, {len(missing)} page misses")
+        self._stats.add('ocr_cache_hits', 0.0, count=len(keys) - len(missing))
+
+        if missing:
+            page_texts = recognizer.recognize_pages([pages[i] for i in missing])
+            new_entries = {keys[i]: texts for i, texts in zip(missing, page_texts)}
+            self.cache.put_many([(key, json.dumps(texts, ensure_ascii=False)) for key, texts in new_entries.items() if any(texts)])
+            cached.update(new_entries)
+        return [cached[key] for key in keys]
@@ -0,0 +1,100 @@
+import json
+import logging
+import os
+
+import fitz
+
+from data.core.parsing_utils.json_writer import StreamingJSONWriter
+from data.core.parsing_utils.pipeline import detections_hash, page_content_hash
+
+
+def parse_page_range(text):
+    """Turns "1-3,7" into [1, 2, 3, 7]."""
+    pages = set()
+    for part in text.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            first, last = part.split("-", 1)
+            pages.update(range(int(first), int(last) + 1))
+        else:
+            pages.add(int(part))
+    return sorted(pages)
+
+
+def is_edited(page_data):
+    """True if the page was changed by hand since the pipeline wrote it.
+
+    Pages written before hashes were recorded cannot be checked and count as
+    edited, as do pages marked to be ignored in the GUI.
+    """
+    stored = page_data.get('detections_hash')
+    if stored is None or page_data.get('ignore'):
+        return True
+    return detections_hash(page_data.get('detections', [])) != stored
+
+
+def changed_pages(doc, existing_pages, candidates):
+    changed = []
+    for page_number in candidates:
+        page_data = existing_pages.get(page_number)
+        content_hash = page_content_hash(doc.load_page(page_number - 1))
+        if page_data is None or page_data.get('content_hash') != content_hash:
+            changed.append(page_number)
+    return changed
+
+
+def reprocess_pdf(pipeline, pdf_path, output_json, pages=None, changed_only=False, force=False, progress_queue=None):
+    """Re-runs the pipeline on part of a document and merges it into `output_json`.
+
+    `pages` restricts the run to the given 1-based page numbers; with
+    `changed_only` only those pages whose PDF content differs from the
+    `content_hash` stored in the JSON are re-run (e.g. after replacing the PDF
+    with a rescan). Pages edited in the GUI are kept unless `force` is set.
+    Returns the page numbers that were re-run, kept as edited and dropped.
+    """
+    with open(output_json, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    existing_pages = {page_data['page']: page_data for page_data in data.get('pages', [])}
+
+    doc = fitz.open(pdf_path)
+    try:
+        num_pages = len(doc)
+        candidates = [page for page in (pages or range(1, num_pages + 1)) if 0 < page <= num_pages]
+        if changed_only:
+            candidates = changed_pages(doc, existing_pages, candidates)
+    finally:
+        doc.close()
+
+    selected = []
+    preserved = []
+    for page_number in candidates:
+        if not force and page_number in existing_pages and is_edited(existing_pages[page_number]):
+            preserved.append(page_number)
+        else:
+            selected.append(page_number)
+    if preserved:
+        logging.warning(f"Keeping {len(preserved)} hand-edited pages of {output_json}: {preserved}")
+
+    # Pages the (replaced) PDF no longer has.
+    dropped = sorted(page for page in existing_pages if page > num_pages)
+
+    if selected:
+        partial_json = output_json + ".reprocess.json"
+        try:
+            pipeline.run(pdf_path, partial_json, progress_queue, pages=selected, report_path=output_json + ".report.json")
+            with open(partial_json, 'r', encoding='utf-8') as f:
+                for page_data in json.load(f)['pages']:
+                    existing_pages[page_data['page']] = page_data
+        finally:
+            if os.path.exists(partial_json):
+                os.remove(partial_json)
+
+    if selected or dropped:
+        with StreamingJSONWriter(output_json, metadata=data.get('metadata', {})) as writer:
+            for page_number in sorted(existing_pages):
+                if page_number <= num_pages:
+                    writer.write_page(existing_pages[page_number])
+    logging.debug(f"Re-processed pages {selected} of {output_json}")
+    return {'reprocessed': selected, 'preserved': preserved, 'dropped': dropped}
@@ -0,0 +1,112 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+# Display order for the progress window; stages not listed follow alphabetically.
+STAGE_ORDER = ['text_layer', 'rasterize', 'layout', 'ocr', 'caption', 'serialize']
+
+
+class RunStats:
+    """Per-stage timings, counts and bytes of one pipeline run.
+
+    Stages are recorded from several pipeline threads at once, both as
+    document totals and per page. Where one model call serves several pages
+    or classes (batched layout, OCR and captioning), its time is split over
+    them by `split` in proportion to the pixels each contributed.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.finished = None
+        self.pages_done = 0
+        self.totals = {}
+        self.pages = {}
+
+    def _add_locked(self, stage, seconds, page, count, nbytes):
+        targets = [self.totals]
+        if page is not None:
+            targets.append(self.pages.setdefault(page, {}))
+        for target in targets:
+            entry = target.setdefault(stage, {'seconds': 0.0, 'count': 0, 'bytes': 0})
+            entry['seconds'] += seconds
+            entry['count'] += count
+            entry['bytes'] += nbytes
+
+    def add(self, stage, seconds, page=None, count=0, nbytes=0):
+        with self._lock:
+            self._add_locked(stage, seconds, page, count, nbytes)
+
+    def split(self, seconds, shares):
+        # shares: (stage, page, weight, count, nbytes)
+        total_weight = sum(weight for _, _, weight, _, _ in shares) or 1
+        with self._lock:
+            for stage, page, weight, count, nbytes in shares:
+                self._add_locked(stage, seconds * weight / total_weight, page, count, nbytes)
+
+    @contextmanager
+    def timer(self, stage, page=None, count=0, nbytes=0):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start, page, count, nbytes)
+
+    def page_done(self):
+        with self._lock:
+            self.pages_done += 1
+
+    def finish(self):
+        self.finished = time.perf_counter()
+
+    def elapsed(self):
+        return (self.finished or time.perf_counter()) - self.started
+
+    def snapshot(self):
+        with self._lock:
+            return {stage: dict(entry) for stage, entry in self.totals.items()}
+
+    def summary_lines(self):
+        totals = self.snapshot()
+        order = {stage: index for index, stage in enumerate(STAGE_ORDER)}
+
+        def sort_key(stage):
+            base = stage.split(":", 1)[0]
+            return order.get(base, len(order)), stage
+
+        lines = []
+        for stage in sorted(totals, key=sort_key):
+            entry = totals[stage]
+            if not entry['seconds'] and not entry['bytes']:
+                lines.append(f"{stage}: {entry['count']}")
+                continue
+            line = f"{stage}: {entry['seconds']:.1f} s"
+            if entry['bytes']:
+                line += f" ({entry['count']} items, {entry['bytes'] / 1e6:.1f} MB)"
+            elif entry['count']:
+                line += f" ({entry['count']} items)"
+            lines.append(line)
+        return lines
+
+    def report(self, **info):
+        elapsed = self.elapsed()
+        with self._lock:
+            report = dict(info)
+            report['wall_seconds'] = round(elapsed, 3)
+            report['pages_done'] = self.pages_done
+            report['pages_per_second'] = round(self.pages_done / elapsed, 3) if elapsed > 0 else None
+            report['stages'] = _rounded(self.totals)
+            report['pages'] = {str(page): _rounded(stages) for page, stages in sorted(self.pages.items())}
+        return report
+
+    def write_report(self, path, **info):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(**info), f, indent=4, ensure_ascii=False)
+
+
+def _rounded(stages):
+    return {
+        stage: {'seconds': round(entry['seconds'], 4), 'count': entry['count'], 'bytes': entry['bytes']}
+        for stage, entry in sorted(stages.items())
+    }
@@ -3,6 +3,14 @@ import os
 import fitz  
 from tkinter import messagebox
 
+from data.autosave import AutoSaver
+from data.document_model import DocumentModel
+from data.edit_journal import EditJournal
+from data.sqlite_store import SQLiteDocument, is_sqlite_path
+
+# Journaled edits after which the JSON is rewritten in full.
+COMPACT_EVERY = 200
+
 class DataManager:
     def __init__(self, json_path, pdf_path):
         self.json_path = json_path
@@ -10,6 +18,9 @@ class DataManager:
         self.data = {}
         self.metadata = {}
         self.doc = None
+        self.document = DocumentModel(self.data)
+        self.journal = EditJournal(json_path)
+        self.autosaver = None
 
         self.load_data()
 
@@ -18,49 +29,79 @@ class DataManager:
             if not os.path.exists(self.json_path):
                 messagebox.showerror("Error", f"JSON file not found: {self.json_path}")
                 return
+            elif is_sqlite_path(self.json_path):
+                # Rows are committed as they are edited, so there is nothing to journal.
+                self.journal = None
+                self.document = SQLiteDocument(self.json_path)
+                replayed = 0
             else:
                 with open(self.json_path, 'r', encoding='utf-8') as f:
                     self.data = json.load(f)
+                self.document = DocumentModel(self.data)
+                replayed = self.journal.replay(self.document)
             self.doc = fitz.open(self.pdf_path)
 
-            self.metadata = self.data.get("metadata", {})
-
             self.image_counter = 0
             self.chapter_counter = 0
 
-            for page_data in self.data['pages']:
-                page_data['ignore'] = page_data.get('ignore', False)
-                page_data['index'] = self.data['pages'].index(page_data)
+            with self.document.batch():
+                for page_data, detection in self.document.pictures():
+                    if 'name' not in detection:
+                        self.document.update_detection(page_data['page'], detection['id'], name=f"image_{self.image_counter}")
+                        self.image_counter += 1
+                    else:
+                        try:
+                            idx = int(detection['name'].split('_')[1])
+                            if idx >= self.image_counter:
+                                self.image_counter = idx + 1
+                        except (IndexError, ValueError):
+                            pass  
+                for page_data, detection in self.document.section_headers():
+                    if 'name' not in detection:
+                        self.document.update_detection(page_data['page'], detection['id'], name=detection['text'])
+                        self.chapter_counter += 1
+                    else:
+                        try:
+                            idx = int(detection['name'].split(' ')[1])
+                            if idx >= self.chapter_counter:
+                                self.chapter_counter = idx
+                        except (IndexError, ValueError):
+                            pass  
 
-                detections = page_data.get('detections', [])
-                for idx, detection in enumerate(detections):
-                    detection['id'] = detection.get('id', idx)
-                    if detection['class'] == 'Picture':
-                        if 'name' not in detection:
-                            detection['name'] = f"image_{self.image_counter}"
-                            self.image_counter += 1
-                        else:
-                            try:
-                                idx = int(detection['name'].split('_')[1])
-                                if idx >= self.image_counter:
-                                    self.image_counter = idx + 1
-                            except (IndexError, ValueError):
-                                pass  
-                    if detection.get('class') == 'Section-header':
-                        if 'name' not in detection:
-                            detection['name'] = detection['text']
-                            self.chapter_counter += 1
-                        else:
-                            try:
-                                idx = int(detection['name'].split(' ')[1])
-                                if idx >= self.chapter_counter:
-                                    self.chapter_counter = idx
-                            except (IndexError, ValueError):
-                                pass  
+            self.metadata = self.document.metadata()
+            if self.journal is not None:
+                self.autosaver = AutoSaver(self.document, self.journal, self.json_path, compact_every=COMPACT_EVERY)
+                self.document.subscribe(self.autosaver.record)
+                if replayed:
+                    print(f"Recovered {replayed} unsaved edits from {self.journal.path}")
+                    self.autosaver.request(compact=True)
 
         except Exception as e:
             messagebox.showerror("Error", f"An error occurred while loading data: {e}")
 
     def save_data(self):
-        with open(self.json_path, 'w', encoding='utf-8') as f:
-            json.dump(self.data, f, indent=4, ensure_ascii=False)
+        """Asks the autosaver to write out pending edits; returns without waiting for the disk.
+
+        Results arrive on `save_results()`. SQLite documents commit every edit
+        as it is made, so there is nothing to do for them.
+        """
+        if self.autosaver is not None:
+            self.autosaver.request()
+
+    def save_results(self):
+        """('saved' | 'error', message) tuples reported since the last call."""
+        results = []
+        if self.autosaver is not None:
+            while not self.autosaver.results.empty():
+                results.append(self.autosaver.results.get_nowait())
+        return results
+
+    def close(self):
+        """Writes out all edits and waits for it; raises if the last save failed."""
+        if self.autosaver is not None:
+            self.autosaver.close()
+            results = self.save_results()
+            self.journal.close()
+            if results and results[-1][0] == 'error':
+                raise RuntimeError(results[-1][1])
+        self.document.close()
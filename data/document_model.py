@@ -0,0 +1,219 @@
+import contextlib
+import threading
+
+INDEXED_CLASSES = ('Picture', 'Section-header')
+
+
+class DocumentModel:
+    """Indexed view over the document JSON.
+
+    The page and detection dicts stay the source of truth and are saved as
+    they are; the model keeps lookups from page number and (page number,
+    detection id) to them, plus per-class indexes of pictures, chapter headers
+    and word-level chapter marks, so the viewer and the exporters never scan
+    the whole document. Edits go through the methods below to keep the
+    indexes current; each one is also described as a small JSON patch that is
+    passed to the subscribed listeners (see data/edit_journal.py) and can be
+    replayed with `apply`.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self.data.setdefault('pages', [])
+        self._pages = {}
+        # page number -> {detection id: detection}
+        self._detections = {}
+        self._next_id = {}
+        # class name -> {page number: detections of that class, in page order}
+        self._by_class = {name: {} for name in INDEXED_CLASSES + ('chapter_words',)}
+        self._listeners = []
+        # Held while an edit is applied, so a snapshot never sees half of one.
+        self.lock = threading.RLock()
+        self.rebuild()
+
+    def rebuild(self):
+        self._pages.clear()
+        self._detections.clear()
+        self._next_id.clear()
+        for index in self._by_class.values():
+            index.clear()
+        for position, page_data in enumerate(self.data['pages']):
+            page_data['ignore'] = page_data.get('ignore', False)
+            page_data['index'] = position
+            self._pages[page_data['page']] = page_data
+            self._index_page(page_data)
+
+    def _index_page(self, page_data):
+        page_number = page_data['page']
+        for index in self._by_class.values():
+            index.pop(page_number, None)
+
+        detections = page_data.setdefault('detections', [])
+        seen = set()
+        by_id = self._detections[page_number] = {}
+        for idx, detection in enumerate(detections):
+            detection['id'] = detection.get('id', idx)
+            if detection['id'] in seen:
+                # Hand-merged files can repeat ids; give the later one a free id.
+                detection['id'] = max(seen) + 1
+            seen.add(detection['id'])
+            by_id[detection['id']] = detection
+            class_name = detection.get('class')
+            if class_name in INDEXED_CLASSES:
+                self._by_class[class_name].setdefault(page_number, []).append(detection)
+            if detection.get('chapter_words'):
+                self._by_class['chapter_words'].setdefault(page_number, []).append(detection)
+        self._next_id[page_number] = max(seen, default=0) + 1
+
+    def _indexed(self, names, include_ignored=True):
+        """(page_data, detection) pairs of the given indexes in document order."""
+        page_numbers = set()
+        for name in names:
+            page_numbers.update(self._by_class[name])
+        for page_number in sorted(page_numbers, key=lambda number: self._pages[number]['index']):
+            page_data = self._pages[page_number]
+            if not include_ignored and page_data.get('ignore', False):
+                continue
+            if len(names) == 1:
+                for detection in self._by_class[names[0]][page_number]:
+                    yield page_data, detection
+            else:
+                members = {id(detection) for name in names for detection in self._by_class[name].get(page_number, [])}
+                for detection in page_data['detections']:
+                    if id(detection) in members:
+                        yield page_data, detection
+
+    # Lookups
+
+    def metadata(self):
+        return self.data.get('metadata', {})
+
+    def pages(self):
+        return self.data['pages']
+
+    def page_count(self):
+        return len(self.data['pages'])
+
+    def page_at(self, position):
+        return self.data['pages'][position]
+
+    def page(self, page_number):
+        return self._pages.get(page_number)
+
+    def detection(self, page_number, detection_id):
+        return self._detections.get(page_number, {}).get(detection_id)
+
+    def pictures(self):
+        return list(self._indexed(('Picture',)))
+
+    def section_headers(self, include_ignored=True):
+        return list(self._indexed(('Section-header',), include_ignored))
+
+    def has_section_headers(self, include_ignored=True):
+        return next(self._indexed(('Section-header',), include_ignored), None) is not None
+
+    def toc_entries(self):
+        """Section headers and detections with word-level chapter marks, in reading order."""
+        return list(self._indexed(('Section-header', 'chapter_words')))
+
+    def chapter_body(self, page_data, chapter_detection):
+        """Yields (page_data, detection) after a chapter start up to the next Section-header.
+
+        Ignored pages are skipped. Only the pages the chapter spans are visited.
+        """
+        pages = self.data['pages']
+        detections = page_data['detections']
+        start = next((idx for idx, detection in enumerate(detections) if detection is chapter_detection), len(detections))
+        for position in range(page_data['index'], len(pages)):
+            current = pages[position]
+            if current.get('ignore', False):
+                continue
+            for detection in detections[start + 1:] if current is page_data else current.get('detections', []):
+                if detection.get('class') == 'Section-header':
+                    return
+                yield current, detection
+
+    # Edits
+
+    def batch(self):
+        return contextlib.nullcontext()
+
+    def close(self):
+        pass
+
+    def subscribe(self, listener):
+        self._listeners.append(listener)
+
+    def _edit(self, patch):
+        with self.lock:
+            result = self.apply(patch)
+            for listener in self._listeners:
+                listener(patch)
+        return result
+
+    def add_detection(self, page_number, detection):
+        detection['id'] = self._next_id[page_number]
+        return self._edit({'op': 'add', 'page': page_number, 'detection': detection})
+
+    def remove_detection(self, page_number, detection_id):
+        if self.detection(page_number, detection_id) is None:
+            return None
+        return self._edit({'op': 'remove', 'page': page_number, 'id': detection_id})
+
+    def update_detection(self, page_number, detection_id, **fields):
+        """Sets the given fields on a detection; a value of None removes the field."""
+        return self._edit({'op': 'update', 'page': page_number, 'id': detection_id, 'fields': fields})
+
+    def set_class(self, page_number, detection_id, class_name, **fields):
+        fields['class'] = class_name
+        return self.update_detection(page_number, detection_id, **fields)
+
+    def set_page_ignored(self, page_number, ignore):
+        self._edit({'op': 'ignore', 'page': page_number, 'value': ignore})
+
+    def set_metadata(self, metadata):
+        self._edit({'op': 'metadata', 'value': metadata})
+
+    def apply(self, patch):
+        """Applies one edit patch without notifying the listeners.
+
+        Patches are idempotent, so replaying a journal twice is harmless.
+        Raises KeyError if the page or detection does not exist.
+        """
+        op = patch['op']
+        if op == 'metadata':
+            self.data['metadata'] = patch['value']
+            return None
+
+        page_number = patch['page']
+        page_data = self._pages[page_number]
+        if op == 'ignore':
+            page_data['ignore'] = patch['value']
+            return None
+        if op == 'add':
+            detection = patch['detection']
+            existing = self.detection(page_number, detection['id'])
+            if existing is None:
+                page_data['detections'].append(detection)
+            else:
+                page_data['detections'] = [detection if d is existing else d for d in page_data['detections']]
+            self._index_page(page_data)
+            return detection
+        if op == 'remove':
+            detection = self.detection(page_number, patch['id'])
+            if detection is not None:
+                page_data['detections'] = [d for d in page_data['detections'] if d is not detection]
+                self._index_page(page_data)
+            return detection
+        if op == 'update':
+            detection = self._detections[page_number][patch['id']]
+            fields = patch['fields']
+            for key, value in fields.items():
+                if value is None:
+                    detection.pop(key, None)
+                else:
+                    detection[key] = value
+            if 'class' in fields or 'chapter_words' in fields:
+                self._index_page(page_data)
+            return detection
+        raise ValueError(f"Unknown edit: {op}")
@@ -0,0 +1,106 @@
+import json
+import logging
+import os
+import tempfile
+
+
+def write_text_atomic(path, text):
+    """Writes `text` to a temporary file next to `path` and renames it over `path`.
+
+    A crash mid-write leaves the previous file intact instead of a truncated one.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def write_json_atomic(path, data):
+    write_text_atomic(path, json.dumps(data, indent=4, ensure_ascii=False))
+
+
+def _file_signature(path):
+    stat = os.stat(path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+class EditJournal:
+    """Append-only log of document edits kept next to the JSON (`<json>.journal`).
+
+    Each line is one patch from DocumentModel, written by AutoSaver. The
+    first line records the size and mtime of the JSON the edits apply to, so
+    a journal left behind by a crash is not replayed onto a file that was
+    regenerated since.
+    """
+
+    def __init__(self, json_path):
+        self.json_path = json_path
+        self.path = json_path + ".journal"
+        self.count = 0
+        self._file = None
+
+    def write(self, lines):
+        """Appends already serialized patches and syncs them to disk."""
+        if self._file is None:
+            new = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+            self._file = open(self.path, 'a', encoding='utf-8')
+            if new:
+                self._file.write(json.dumps({'op': 'base', **_file_signature(self.json_path)}) + "\n")
+        self._file.write("".join(line + "\n" for line in lines))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.count += len(lines)
+
+    def read(self):
+        """Patches in the journal; empty if there is none or it belongs to another version of the JSON."""
+        if not os.path.exists(self.path):
+            return []
+        patches = []
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                try:
+                    patches.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # Only the last line can be torn by a crash; anything after it is lost anyway.
+                    logging.warning(f"Ignoring unreadable line {line_number} of {self.path}")
+                    break
+        if not patches:
+            return []
+        base = patches.pop(0)
+        if base.get('op') != 'base' or {key: base.get(key) for key in ('size', 'mtime_ns')} != _file_signature(self.json_path):
+            stale_path = self.path + ".stale"
+            logging.warning(f"{self.path} does not match {self.json_path}; moved it to {stale_path}")
+            self.close()
+            os.replace(self.path, stale_path)
+            return []
+        return patches
+
+    def replay(self, document):
+        """Applies the journaled edits to `document` and returns how many were applied."""
+        applied = 0
+        for patch in self.read():
+            try:
+                document.apply(patch)
+                applied += 1
+            except (KeyError, ValueError) as e:
+                logging.warning(f"Skipping journaled edit {patch}: {e}")
+        return applied
+
+    def clear(self):
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self.count = 0
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -8,8 +8,8 @@ from PIL import Image
 import uuid  
 
 class EPUBExporter:
-    def __init__(self, data, metadata, pdf_path):
-        self.data = data
+    def __init__(self, document, metadata, pdf_path):
+        self.document = document
         self.metadata = metadata
         self.pdf_path = pdf_path
         self.image_counter = 0  
@@ -31,19 +31,13 @@ class EPUBExporter:
         toc = []
 
         
-        chapter_starts = []
-        for page_data in self.data['pages']:
-            if page_data.get('ignore', False):
-                continue
-            for detection in page_data.get('detections', []):
-                if detection.get('class') == 'Section-header':
-                    chapter_starts.append((page_data, detection))
+        chapter_starts = self.document.section_headers(include_ignored=False)
 
         image_filenames = []  
 
         for idx, (chapter_page_data, chapter_detection) in enumerate(chapter_starts):
             chapter_title = chapter_detection['text']  
-            chapter_content, chapter_image_filenames = self.get_chapter_content(chapter_detection)
+            chapter_content, chapter_image_filenames = self.get_chapter_content(chapter_page_data, chapter_detection)
             image_filenames.extend(chapter_image_filenames)
             chapter = epub.EpubHtml(title=chapter_title, file_name=f'chap_{idx}.xhtml', lang='en')
             chapter.content = chapter_content
@@ -117,13 +111,7 @@ class EPUBExporter:
         for field in required_metadata_fields:
             if not self.metadata.get(field):
                 return False
-        toc_exists = any(
-            detection.get('class') == 'Section-header'
-            for page_data in self.data['pages']
-            if not page_data.get('ignore', False)
-            for detection in page_data.get('detections', [])
-        )
-        return toc_exists
+        return self.document.has_section_headers(include_ignored=False)
 
     def set_metadata(self, book):
         book.set_identifier('id123456')
@@ -136,34 +124,14 @@ class EPUBExporter:
             if value:
                 book.add_metadata('DC', meta_field.lower().replace(' ', '_'), value)
 
-    def get_chapter_content(self, chapter_detection):
-        elements = []
-        collecting = False
-        image_filenames = []
+    def get_chapter_content(self, chapter_page_data, chapter_detection):
+        elements = [{'type': 'chapter_start', 'text': chapter_detection['text']}]
 
-        chapter_start_found = False
-
-        for page_data in self.data['pages']:
-            if page_data.get('ignore', False):
-                continue
-            detections = page_data.get('detections', [])
-            for detection in detections:
-                if detection.get('class') == 'Section-header' and detection == chapter_detection:
-                    collecting = True
-                    chapter_start_found = True
-                    elements.append({'type': 'chapter_start', 'text': detection['text']})
-                elif detection.get('class') == 'Section-header' and chapter_start_found:
-                    
-                    collecting = False
-                    break
-                elif collecting:
-                    if detection.get('class') == 'Text':
-                        elements.append({'type': 'text', 'text': detection['text']})
-                    elif detection.get('class') == 'Picture':
-                        elements.append({'type': 'image', 'detection': detection, 'page_data': page_data})
-            if not collecting and chapter_start_found:
-                
-                break
+        for page_data, detection in self.document.chapter_body(chapter_page_data, chapter_detection):
+            if detection.get('class') == 'Text':
+                elements.append({'type': 'text', 'text': detection['text']})
+            elif detection.get('class') == 'Picture':
+                elements.append({'type': 'image', 'detection': detection, 'page_data': page_data})
 
         
         content, image_filenames = self.format_chapter_content(elements)
@@ -9,8 +9,8 @@ from PIL import Image
 import uuid
 
 class PDFExporter:
-    def __init__(self, data, metadata, pdf_path):
-        self.data = data
+    def __init__(self, document, metadata, pdf_path):
+        self.document = document
         self.metadata = metadata
         self.pdf_path = pdf_path
 
@@ -32,17 +32,11 @@ class PDFExporter:
         width, height = page_size
 
         
-        chapter_starts = []
-        for page_data in self.data['pages']:
-            if page_data.get('ignore', False):
-                continue
-            for detection in page_data.get('detections', []):
-                if detection.get('class') == 'Section-header':
-                    chapter_starts.append((page_data, detection))
+        chapter_starts = self.document.section_headers(include_ignored=False)
 
         for idx, (chapter_page_data, chapter_detection) in enumerate(chapter_starts):
             chapter_title = chapter_detection['text']
-            chapter_content, chapter_images = self.get_chapter_content(chapter_detection)
+            chapter_content, chapter_images = self.get_chapter_content(chapter_page_data, chapter_detection)
 
             
             c.setFont("Times-Bold", 16)
@@ -92,38 +86,16 @@ class PDFExporter:
         for field in required_metadata_fields:
             if not self.metadata.get(field):
                 return False
-        toc_exists = any(
-            detection.get('class') == 'Section-header'
-            for page_data in self.data['pages']
-            if not page_data.get('ignore', False)
-            for detection in page_data.get('detections', [])
-        )
-        return toc_exists
-
-    def get_chapter_content(self, chapter_detection):
-        elements = []
-        collecting = False
-
-        for page_data in self.data['pages']:
-            if page_data.get('ignore', False):
-                continue
-            detections = page_data.get('detections', [])
-            for detection in detections:
-                if detection.get('class') == 'Section-header' and detection == chapter_detection:
-                    collecting = True
-                    elements.append({'type': 'chapter_start', 'text': detection['text']})
-                elif detection.get('class') == 'Section-header' and collecting:
-                    
-                    collecting = False
-                    break
-                elif collecting:
-                    if detection.get('class') == 'Text':
-                        elements.append({'type': 'text', 'text': detection['text']})
-                    elif detection.get('class') == 'Picture':
-                        elements.append({'type': 'image', 'detection': detection, 'page_data': page_data})
-            if not collecting and 'collecting' not in locals():
-                
-                break
+        return self.document.has_section_headers(include_ignored=False)
+
+    def get_chapter_content(self, chapter_page_data, chapter_detection):
+        elements = [{'type': 'chapter_start', 'text': chapter_detection['text']}]
+
+        for page_data, detection in self.document.chapter_body(chapter_page_data, chapter_detection):
+            if detection.get('class') == 'Text':
+                elements.append({'type': 'text', 'text': detection['text']})
+            elif detection.get('class') == 'Picture':
+                elements.append({'type': 'image', 'detection': detection, 'page_data': page_data})
 
         return elements, []
 
@@ -3,8 +3,8 @@ from tkinter import messagebox, filedialog
 import os
 
 class TextExporter:
-    def __init__(self, data, metadata, pdf_path):
-        self.data = data
+    def __init__(self, document, metadata, pdf_path):
+        self.document = document
         self.metadata = metadata
         self.pdf_path = pdf_path
 
@@ -29,20 +29,14 @@ class TextExporter:
             txt_file.write("\n")
 
             
-            chapter_starts = []
-            for page_data in self.data['pages']:
-                if page_data.get('ignore', False):
-                    continue
-                for detection in page_data.get('detections', []):
-                    if detection.get('class') == 'Section-header':
-                        chapter_starts.append((page_data, detection))
+            chapter_starts = self.document.section_headers(include_ignored=False)
 
             for idx, (chapter_page_data, chapter_detection) in enumerate(chapter_starts):
                 chapter_title = chapter_detection['text']
                 txt_file.write(f"{chapter_title}\n")
                 txt_file.write("=" * len(chapter_title) + "\n\n")
 
-                chapter_content = self.get_chapter_content(chapter_detection)
+                chapter_content = self.get_chapter_content(chapter_page_data, chapter_detection)
 
                 for element in chapter_content:
                     if element['type'] == 'text':
@@ -57,35 +51,13 @@ class TextExporter:
         for field in required_metadata_fields:
             if not self.metadata.get(field):
                 return False
-        toc_exists = any(
-            detection.get('class') == 'Section-header'
-            for page_data in self.data['pages']
-            if not page_data.get('ignore', False)
-            for detection in page_data.get('detections', [])
-        )
-        return toc_exists
+        return self.document.has_section_headers(include_ignored=False)
 
-    def get_chapter_content(self, chapter_detection):
-        elements = []
-        collecting = False
+    def get_chapter_content(self, chapter_page_data, chapter_detection):
+        elements = [{'type': 'chapter_start', 'text': chapter_detection['text']}]
 
-        for page_data in self.data['pages']:
-            if page_data.get('ignore', False):
-                continue
-            detections = page_data.get('detections', [])
-            for detection in detections:
-                if detection.get('class') == 'Section-header' and detection == chapter_detection:
-                    collecting = True
-                    elements.append({'type': 'chapter_start', 'text': detection['text']})
-                elif detection.get('class') == 'Section-header' and collecting:
-                    
-                    collecting = False
-                    break
-                elif collecting:
-                    if detection.get('class') == 'Text':
-                        elements.append({'type': 'text', 'text': detection['text']})
-            if not collecting and 'collecting' not in locals():
-                
-                break
+        for page_data, detection in self.document.chapter_body(chapter_page_data, chapter_detection):
+            if detection.get('class') == 'Text':
+                elements.append({'type': 'text', 'text': detection['text']})
 
         return elements
@@ -1,7 +1,6 @@
 import tkinter as tk
 from tkinter import simpledialog
 import json
-from data.metadata.fetch_metadata import fetch_metadata_from_isbn
 
 class MetadataManager:
     def __init__(self, viewer):
@@ -25,7 +24,7 @@ class MetadataManager:
 
         def save_metadata():
             self.viewer.metadata = {field: var.get() for field, var in self.viewer.metadata_vars.items()}
-            self.viewer.data["metadata"] = self.viewer.metadata
+            self.viewer.document.set_metadata(self.viewer.metadata)
             self.viewer.data_manager.save_data()
             self.display_metadata()
             dialog.destroy()
@@ -36,9 +35,10 @@ class MetadataManager:
     def fetch_metadata_by_isbn(self):
         isbn = simpledialog.askstring("ISBN", "Enter ISBN:")
         if isbn:
+            from data.metadata.fetch_metadata import fetch_metadata_from_isbn
             metadata = fetch_metadata_from_isbn(isbn)
             if metadata:
                 self.viewer.metadata.update(metadata)
-                self.viewer.data["metadata"] = self.viewer.metadata
+                self.viewer.document.set_metadata(self.viewer.metadata)
                 self.viewer.data_manager.save_data()
                 self.display_metadata()
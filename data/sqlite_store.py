@@ -0,0 +1,413 @@
+"""Single-file SQLite storage for documents, as an alternative to the JSON file.
+
+Pages and detections are rows that are read on demand and written one
+transaction per edit, so opening a huge document does not load it and an
+edit never rewrites more than the rows it touches. Conversion to and from
+the JSON schema is lossless:
+
+    python -m data.sqlite_store import book.json book.sqlite
+    python -m data.sqlite_store export book.sqlite book.json
+"""
+import argparse
+import contextlib
+import json
+import os
+import sqlite3
+from collections import OrderedDict
+
+from data.edit_journal import write_json_atomic
+
+SQLITE_EXTENSIONS = ('.sqlite', '.sqlite3', '.db')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS document (
+    key TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS pages (
+    page INTEGER PRIMARY KEY,
+    position INTEGER NOT NULL UNIQUE,
+    ignore INTEGER NOT NULL DEFAULT 0,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS detections (
+    page INTEGER NOT NULL REFERENCES pages (page),
+    id INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    class TEXT,
+    chapter_words INTEGER NOT NULL DEFAULT 0,
+    data TEXT NOT NULL,
+    PRIMARY KEY (page, id)
+);
+CREATE INDEX IF NOT EXISTS detections_order ON detections (page, position);
+CREATE INDEX IF NOT EXISTS detections_class ON detections (class, page);
+"""
+
+
+def is_sqlite_path(path):
+    return path.lower().endswith(SQLITE_EXTENSIONS)
+
+
+def _dumps(value):
+    return json.dumps(value, ensure_ascii=False)
+
+
+def connect(path):
+    conn = sqlite3.connect(path, isolation_level=None)
+    # WAL lets other processes read the file while the GUI writes to it.
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _detection_ids(detections):
+    """The ids DocumentModel gives these detections on load."""
+    ids = []
+    seen = set()
+    for idx, detection in enumerate(detections):
+        detection_id = detection.get('id', idx)
+        if detection_id in seen:
+            detection_id = max(seen) + 1
+        seen.add(detection_id)
+        ids.append(detection_id)
+    return ids
+
+
+def import_json(json_path, db_path):
+    with open(json_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    conn = connect(db_path)
+    try:
+        conn.execute("BEGIN")
+        # Top-level keys other than pages; the pages row only records where they go.
+        conn.executemany(
+            "INSERT INTO document (key, position, value) VALUES (?, ?, ?)",
+            [(key, position, _dumps(None if key == 'pages' else value)) for position, (key, value) in enumerate(data.items())],
+        )
+        for position, page_data in enumerate(data.get('pages', [])):
+            detections = page_data.get('detections', [])
+            # The placeholder keeps the key order of the page so export gives back the same JSON.
+            stored = {key: (None if key == 'detections' else value) for key, value in page_data.items()}
+            conn.execute(
+                "INSERT INTO pages (page, position, ignore, data) VALUES (?, ?, ?, ?)",
+                (page_data['page'], position, int(bool(page_data.get('ignore', False))), _dumps(stored)),
+            )
+            conn.executemany(
+                "INSERT INTO detections (page, id, position, class, chapter_words, data) VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (page_data['page'], detection_id, idx, detection.get('class'),
+                     int(bool(detection.get('chapter_words'))), _dumps(detection))
+                    for idx, (detection_id, detection) in enumerate(zip(_detection_ids(detections), detections))
+                ],
+            )
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
+
+
+def export_json(db_path, json_path):
+    conn = connect(db_path)
+    try:
+        data = {}
+        for key, value in conn.execute("SELECT key, value FROM document ORDER BY position").fetchall():
+            data[key] = _export_pages(conn) if key == 'pages' else json.loads(value)
+    finally:
+        conn.close()
+    write_json_atomic(json_path, data)
+
+
+def _export_pages(conn):
+    pages = []
+    rows = conn.execute(
+        "SELECT p.page, p.data, d.data FROM pages p LEFT JOIN detections d ON d.page = p.page "
+        "ORDER BY p.position, d.position"
+    )
+    current = None
+    for page_number, page_json, detection_json in rows:
+        if current is None or current['page'] != page_number:
+            current = json.loads(page_json)
+            if 'detections' in current:
+                current['detections'] = []
+            pages.append(current)
+        if detection_json is not None:
+            current.setdefault('detections', []).append(json.loads(detection_json))
+    return pages
+
+
+class SQLiteDocument:
+    """DocumentModel over a SQLite file; pages are loaded when asked for.
+
+    Page dicts are kept in a small LRU cache. Every edit goes to the database
+    in its own transaction (or in one for a `batch()`), so dicts handed out
+    earlier may be stale after their page is evicted; look detections up again
+    by page number and id instead of holding on to them.
+    """
+
+    def __init__(self, path, cache_pages=256):
+        self.path = path
+        self.conn = connect(path)
+        self.cache_pages = cache_pages
+        self._cache = OrderedDict()
+        self._listeners = []
+        self._batch_depth = 0
+        self._page_count = self.conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+    @contextlib.contextmanager
+    def batch(self):
+        """Groups the edits made inside it into one transaction."""
+        if self._batch_depth == 0:
+            self.conn.execute("BEGIN")
+        self._batch_depth += 1
+        try:
+            yield
+        except BaseException:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                self.conn.execute("ROLLBACK")
+                self._cache.clear()
+            raise
+        self._batch_depth -= 1
+        if self._batch_depth == 0:
+            self.conn.execute("COMMIT")
+
+    def _load_page(self, page_number):
+        row = self.conn.execute("SELECT position, ignore, data FROM pages WHERE page = ?", (page_number,)).fetchone()
+        if row is None:
+            return None
+        position, ignore, page_json = row
+        page_data = json.loads(page_json)
+        page_data['ignore'] = bool(ignore)
+        page_data['index'] = position
+        page_data['detections'] = []
+        for detection_id, detection_json in self.conn.execute(
+                "SELECT id, data FROM detections WHERE page = ? ORDER BY position", (page_number,)):
+            detection = json.loads(detection_json)
+            detection['id'] = detection_id
+            page_data['detections'].append(detection)
+        return page_data
+
+    def _pairs(self, rows):
+        """(page_data, detection) for rows of (page, position, ignore, id, data).
+
+        Pages that are not cached are not loaded for this; they are stood in for
+        by a dict with only their page number, position and ignore flag.
+        """
+        stubs = {}
+        for page_number, position, ignore, detection_id, detection_json in rows:
+            if page_number in self._cache:
+                yield self._cache[page_number], self.detection(page_number, detection_id)
+                continue
+            if page_number not in stubs:
+                stubs[page_number] = {'page': page_number, 'index': position, 'ignore': bool(ignore)}
+            detection = json.loads(detection_json)
+            detection['id'] = detection_id
+            yield stubs[page_number], detection
+
+    # Lookups
+
+    def metadata(self):
+        row = self.conn.execute("SELECT value FROM document WHERE key = 'metadata'").fetchone()
+        return json.loads(row[0]) if row else {}
+
+    def pages(self):
+        for (page_number,) in self.conn.execute("SELECT page FROM pages ORDER BY position").fetchall():
+            yield self.page(page_number)
+
+    def page_count(self):
+        return self._page_count
+
+    def page_at(self, position):
+        row = self.conn.execute("SELECT page FROM pages WHERE position = ?", (position,)).fetchone()
+        if row is None:
+            raise IndexError(position)
+        return self.page(row[0])
+
+    def page(self, page_number):
+        page_data = self._cache.get(page_number)
+        if page_data is not None:
+            self._cache.move_to_end(page_number)
+            return page_data
+        page_data = self._load_page(page_number)
+        if page_data is not None:
+            self._cache[page_number] = page_data
+            while len(self._cache) > self.cache_pages:
+                self._cache.popitem(last=False)
+        return page_data
+
+    def detection(self, page_number, detection_id):
+        page_data = self.page(page_number)
+        if page_data is None:
+            return None
+        return next((d for d in page_data['detections'] if d['id'] == detection_id), None)
+
+    def _indexed(self, where, include_ignored=True, args=()):
+        query = (
+            "SELECT d.page, p.position, p.ignore, d.id, d.data FROM detections d JOIN pages p ON p.page = d.page "
+            f"WHERE ({where}){'' if include_ignored else ' AND p.ignore = 0'} ORDER BY p.position, d.position"
+        )
+        return list(self._pairs(self.conn.execute(query, args).fetchall()))
+
+    def pictures(self):
+        return self._indexed("d.class = 'Picture'")
+
+    def section_headers(self, include_ignored=True):
+        return self._indexed("d.class = 'Section-header'", include_ignored)
+
+    def has_section_headers(self, include_ignored=True):
+        query = "SELECT 1 FROM detections d JOIN pages p ON p.page = d.page WHERE d.class = 'Section-header'"
+        if not include_ignored:
+            query += " AND p.ignore = 0"
+        return self.conn.execute(query + " LIMIT 1").fetchone() is not None
+
+    def toc_entries(self):
+        return self._indexed("d.class = 'Section-header' OR d.chapter_words = 1")
+
+    def chapter_body(self, page_data, chapter_detection):
+        start = self.conn.execute(
+            "SELECT position FROM detections WHERE page = ? AND id = ?", (page_data['page'], chapter_detection['id'])
+        ).fetchone()
+        if start is None:
+            return
+        rows = self.conn.execute(
+            "SELECT d.page, p.position, p.ignore, d.id, d.data, d.class FROM detections d JOIN pages p ON p.page = d.page "
+            "WHERE p.ignore = 0 AND (p.position > ? OR (p.position = ? AND d.position > ?)) "
+            "ORDER BY p.position, d.position",
+            (page_data['index'], page_data['index'], start[0]),
+        )
+
+        def until_next_header():
+            for row in rows:
+                if row[5] == 'Section-header':
+                    return
+                yield row[:5]
+        yield from self._pairs(until_next_header())
+
+    # Edits
+
+    def subscribe(self, listener):
+        self._listeners.append(listener)
+
+    def _edit(self, patch):
+        with self.batch():
+            result = self.apply(patch)
+        for listener in self._listeners:
+            listener(patch)
+        return result
+
+    def add_detection(self, page_number, detection):
+        detection['id'] = self.conn.execute(
+            "SELECT COALESCE(MAX(id), 0) + 1 FROM detections WHERE page = ?", (page_number,)
+        ).fetchone()[0]
+        return self._edit({'op': 'add', 'page': page_number, 'detection': detection})
+
+    def remove_detection(self, page_number, detection_id):
+        if self.detection(page_number, detection_id) is None:
+            return None
+        return self._edit({'op': 'remove', 'page': page_number, 'id': detection_id})
+
+    def update_detection(self, page_number, detection_id, **fields):
+        """Sets the given fields on a detection; a value of None removes the field."""
+        return self._edit({'op': 'update', 'page': page_number, 'id': detection_id, 'fields': fields})
+
+    def set_class(self, page_number, detection_id, class_name, **fields):
+        fields['class'] = class_name
+        return self.update_detection(page_number, detection_id, **fields)
+
+    def set_page_ignored(self, page_number, ignore):
+        self._edit({'op': 'ignore', 'page': page_number, 'value': ignore})
+
+    def set_metadata(self, metadata):
+        self._edit({'op': 'metadata', 'value': metadata})
+
+    def _write_detection(self, page_number, detection, position=None):
+        values = (detection.get('class'), int(bool(detection.get('chapter_words'))), _dumps(detection))
+        if position is None:
+            self.conn.execute(
+                "UPDATE detections SET class = ?, chapter_words = ?, data = ? WHERE page = ? AND id = ?",
+                values + (page_number, detection['id']),
+            )
+        else:
+            self.conn.execute(
+                "INSERT INTO detections (page, id, position, class, chapter_words, data) VALUES (?, ?, ?, ?, ?, ?)",
+                (page_number, detection['id'], position) + values,
+            )
+
+    def apply(self, patch):
+        """Same patches and semantics as DocumentModel.apply."""
+        op = patch['op']
+        if op == 'metadata':
+            self.conn.execute(
+                "INSERT INTO document (key, position, value) "
+                "VALUES ('metadata', (SELECT COALESCE(MAX(position), -1) + 1 FROM document), ?) "
+                "ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+                (_dumps(patch['value']),),
+            )
+            return None
+
+        page_number = patch['page']
+        page_data = self.page(page_number)
+        if page_data is None:
+            raise KeyError(page_number)
+        if op == 'ignore':
+            page_json = json.loads(self.conn.execute("SELECT data FROM pages WHERE page = ?", (page_number,)).fetchone()[0])
+            page_json['ignore'] = patch['value']
+            self.conn.execute(
+                "UPDATE pages SET ignore = ?, data = ? WHERE page = ?", (int(bool(patch['value'])), _dumps(page_json), page_number)
+            )
+            page_data['ignore'] = patch['value']
+            return None
+        if op == 'add':
+            detection = patch['detection']
+            existing = self.detection(page_number, detection['id'])
+            if existing is None:
+                position = self.conn.execute(
+                    "SELECT COALESCE(MAX(position), -1) + 1 FROM detections WHERE page = ?", (page_number,)
+                ).fetchone()[0]
+                self._write_detection(page_number, detection, position)
+                page_data['detections'].append(detection)
+            else:
+                self._write_detection(page_number, detection)
+                page_data['detections'] = [detection if d is existing else d for d in page_data['detections']]
+            return detection
+        if op == 'remove':
+            detection = self.detection(page_number, patch['id'])
+            if detection is not None:
+                self.conn.execute("DELETE FROM detections WHERE page = ? AND id = ?", (page_number, patch['id']))
+                page_data['detections'] = [d for d in page_data['detections'] if d is not detection]
+            return detection
+        if op == 'update':
+            detection = self.detection(page_number, patch['id'])
+            if detection is None:
+                raise KeyError(patch['id'])
+            for key, value in patch['fields'].items():
+                if value is None:
+                    detection.pop(key, None)
+                else:
+                    detection[key] = value
+            self._write_detection(page_number, detection)
+            return detection
+        raise ValueError(f"Unknown edit: {op}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert a document between JSON and SQLite storage.")
+    parser.add_argument("direction", choices=["import", "export"], help="import: JSON to SQLite, export: SQLite to JSON")
+    parser.add_argument("source")
+    parser.add_argument("target")
+    args = parser.parse_args(argv)
+    if args.direction == "import":
+        import_json(args.source, args.target)
+    else:
+        export_json(args.source, args.target)
+    print(f"Wrote {args.target}")
+
+
+if __name__ == '__main__':
+    main()
@@ -25,15 +25,13 @@ def add_new_text(viewer, event):
         y2 = min(y + bbox_height, canvas_height)
         bbox = [x1, y1, x2, y2]
 
-        page_data = viewer.data['pages'][viewer.page_index]
-        detection_id = max([d.get('id', 0) for d in page_data.get('detections', [])], default=0) + 1
+        page_data = viewer.document.page_at(viewer.page_index)
         new_detection = {
-            'id': detection_id,
             'class': 'Text',
             'text': text,
             'bbox': bbox
         }
-        page_data['detections'].append(new_detection)
+        viewer.document.add_detection(page_data['page'], new_detection)
         
         try:
             viewer.data_manager.save_data()
@@ -63,10 +61,9 @@ def edit_existing_text(viewer, event):
             detection_id = int(item_tag)
             mode = None
             index = None
-        page_data = viewer.data['pages'][viewer.page_index]
-        detections = page_data.get('detections', [])
+        page_number = viewer.document.page_at(viewer.page_index)['page']
         
-        detection = next((d for d in detections if d.get('id') == detection_id), None)
+        detection = viewer.document.detection(page_number, detection_id)
         if detection is None:
             continue
         
@@ -93,11 +90,11 @@ def edit_existing_text(viewer, event):
                 new_text = text_var.get()
                 if new_text:
                     words[index] = new_text
-                    detection['text'] = ' '.join(words)
+                    viewer.document.update_detection(page_number, detection_id, text=' '.join(words))
             else:
                 new_text = text_widget.get("1.0", tk.END).strip()
                 if new_text:
-                    detection['text'] = new_text
+                    viewer.document.update_detection(page_number, detection_id, text=new_text)
             
             try:
                 viewer.data_manager.save_data()
@@ -108,9 +105,9 @@ def edit_existing_text(viewer, event):
         def delete_text():
             if mode == 'w' and viewer.edit_mode == 'word':
                 del words[index]
-                detection['text'] = ' '.join(words)
+                viewer.document.update_detection(page_number, detection_id, text=' '.join(words))
             else:
-                detections.remove(detection)
+                viewer.document.remove_detection(page_number, detection_id)
             
             try:
                 viewer.data_manager.save_data()
@@ -122,14 +119,12 @@ def edit_existing_text(viewer, event):
             str_index = str(index)  
             if detection.get('class') == 'Section-header':
                 
-                detection['class'] = 'Text'
-                if 'name' in detection:
-                    del detection['name']
+                viewer.document.set_class(page_number, detection_id, 'Text', name=None)
             elif 'chapter_words' in detection and str_index in detection['chapter_words']:
                 
-                del detection['chapter_words'][str_index]
-                if not detection['chapter_words']:
-                    del detection['chapter_words']
+                chapter_words = dict(detection['chapter_words'])
+                del chapter_words[str_index]
+                viewer.document.update_detection(page_number, detection_id, chapter_words=chapter_words or None)
             else:
                 
                 if mode == 'w' and viewer.edit_mode == 'word':
@@ -137,13 +132,12 @@ def edit_existing_text(viewer, event):
                     chapter_name = simpledialog.askstring("Chapter Name", "Enter chapter name:", parent=dialog)
                     if chapter_name:
                         
-                        if 'chapter_words' not in detection:
-                            detection['chapter_words'] = {}
-                        detection['chapter_words'][str_index] = chapter_name
+                        chapter_words = dict(detection.get('chapter_words', {}))
+                        chapter_words[str_index] = chapter_name
+                        viewer.document.update_detection(page_number, detection_id, chapter_words=chapter_words)
                 else:
                     
-                    detection['class'] = 'Section-header'
-                    detection['name'] = detection['text']
+                    viewer.document.set_class(page_number, detection_id, 'Section-header', name=detection['text'])
             
             viewer.populate_toc()
             viewer.display_page()
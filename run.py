@@ -1,13 +1,15 @@
+import time
+_START_TIME = time.perf_counter()
+
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
 import os
 import threading
-import time
-import importlib.util
+import importlib
 import logging
 import queue  
 
-from data.core.main_gui import PDFViewer  
+from data.core.parsing_utils.run_stats import RunStats
 
 class StartApp(tk.Tk):
     def __init__(self):
@@ -27,6 +29,11 @@ class StartApp(tk.Tk):
         self.pdf_path = None
         self.json_path = None
 
+        self.after_idle(self.report_startup_time)
+
+    def report_startup_time(self):
+        print(f"Startup finished in {time.perf_counter() - _START_TIME:.3f} s")
+
     def load_json_workflow(self):
         
         pdf_file_path = filedialog.askopenfilename(title="Select PDF File", filetypes=[("PDF files", "*.pdf")])
@@ -34,7 +41,7 @@ class StartApp(tk.Tk):
             messagebox.showerror("Error", "No PDF file selected.")
             return
 
-        json_file_path = filedialog.askopenfilename(title="Select JSON File", filetypes=[("JSON files", "*.json")])
+        json_file_path = filedialog.askopenfilename(title="Select JSON File", filetypes=[("JSON files", "*.json"), ("SQLite documents", "*.sqlite *.sqlite3 *.db")])
         if not json_file_path:
             messagebox.showerror("Error", "No JSON file selected.")
             return
@@ -49,7 +56,8 @@ class StartApp(tk.Tk):
         OCRConfigWindow()
 
     def start_pdf_viewer(self, pdf_path, json_path):
-        
+        from data.core.main_gui import PDFViewer
+
         self.destroy()
         PDFViewer(json_path, pdf_path).mainloop()
 
@@ -57,7 +65,7 @@ class OCRConfigWindow(tk.Tk):
     def __init__(self):
         super().__init__()
         self.title("OCR Configuration")
-        self.geometry("400x350")
+        self.geometry("400x520")
 
         self.ocr_model_label = tk.Label(self, text="Select OCR Model:", font=("Helvetica", 12))
         self.ocr_model_label.pack(pady=5)
@@ -158,6 +166,7 @@ class OCRConfigWindow(tk.Tk):
         self.ocr_exception = None
 
         self.progress_queue = queue.Queue()
+        self.stats = RunStats()
 
         self.ocr_thread = threading.Thread(target=self.run_ocr, args=(self.pdf_path, output_json, selected_model, language, use_captioning))
         self.ocr_thread.start()
@@ -167,13 +176,15 @@ class OCRConfigWindow(tk.Tk):
     def run_ocr(self, pdf_path, output_json, selected_model, language, use_captioning):
         
         if selected_model == "GOT-OCR2_CPU":
-            module_name = "data/core/parsing_utils/ocr_got_cpu"
+            module_name = "data.core.parsing_utils.ocr_got_cpu"
             ocr_kwargs = {}
         elif selected_model == "Tesseract":
-            module_name = "data/core/parsing_utils/ocr_tesseract"
-            ocr_kwargs = {'language': language}
+            module_name = "data.core.parsing_utils.ocr_tesseract"
+            workers = os.cpu_count() or 1
+            # Page mode gives the pool one job per page, so a batch needs at least a page per worker.
+            ocr_kwargs = {'language': language, 'workers': workers, 'batch_pages': max(4, workers), 'page_mode': True}
         elif selected_model == "PaddleOCR":
-            module_name = "data/core/parsing_utils/ocr_paddle"
+            module_name = "data.core.parsing_utils.ocr_paddle"
             ocr_kwargs = {'language': language}
         else:
             logging.error(f"Unsupported OCR model selected: {selected_model}")
@@ -181,20 +192,22 @@ class OCRConfigWindow(tk.Tk):
             return
 
         try:
-            
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-            module_path = os.path.join(script_dir, f"{module_name}.py")
-
-            
-            if not os.path.isfile(module_path):
-                raise FileNotFoundError(f"OCR module file not found: {module_path}")
-
-            spec = importlib.util.spec_from_file_location(module_name, module_path)
-            ocr_module = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(ocr_module)
+            if os.environ.get("PDFCURATOR_SERVER"):
+                # Models stay warm in the inference server; this process only renders and assembles pages.
+                from data.core.parsing_utils.inference_client import extract_text_from_pdf
+                ocr_kwargs.pop('workers', None)
+                ocr_kwargs.pop('page_mode', None)
+                if 'batch_pages' in ocr_kwargs:
+                    ocr_kwargs['batch_pages'] = 4
+                extract_text_from_pdf(pdf_path, output_json, self.progress_queue, engine=selected_model, use_captioning=use_captioning, stats=self.stats, **ocr_kwargs)
+                self.ocr_exception = None
+                return
+
+            # Imported under its package name so the Tesseract worker processes can unpickle its functions.
+            ocr_module = importlib.import_module(module_name)
 
             
-            ocr_module.extract_text_from_pdf(pdf_path, output_json, self.progress_queue, use_captioning=use_captioning, **ocr_kwargs)
+            ocr_module.extract_text_from_pdf(pdf_path, output_json, self.progress_queue, use_captioning=use_captioning, stats=self.stats, **ocr_kwargs)
             self.ocr_exception = None  
         except Exception as e:
             logging.error(f"Error during OCR processing: {e}")
@@ -223,6 +236,9 @@ class OCRConfigWindow(tk.Tk):
                 self.progress_label.pack_forget()
                 if hasattr(self, 'time_remaining_label'):
                     self.time_remaining_label.pack_forget()
+                if hasattr(self, 'stage_label'):
+                    self.stage_label.pack_forget()
+                print(f"Run report written to {self.json_path}.report.json")
                 
                 self.open_pdf_button.config(state='normal')
                 
@@ -247,12 +263,22 @@ class OCRConfigWindow(tk.Tk):
             self.time_remaining_label = tk.Label(self, text=time_format)
             self.time_remaining_label.pack(pady=5)
 
+        # Where the time went so far, per pipeline stage.
+        breakdown = "\n".join(self.stats.summary_lines())
+        if hasattr(self, 'stage_label'):
+            self.stage_label.config(text=breakdown)
+        else:
+            self.stage_label = tk.Label(self, text=breakdown, justify=tk.LEFT, font=("Helvetica", 9))
+            self.stage_label.pack(pady=5)
+
     def reset_ui(self):
         
         self.progress_bar.pack_forget()
         self.progress_label.pack_forget()
         if hasattr(self, 'time_remaining_label'):
             self.time_remaining_label.pack_forget()
+        if hasattr(self, 'stage_label'):
+            self.stage_label.pack_forget()
         self.open_pdf_button.config(state='normal')
 
     def get_json_path(self, pdf_path):
@@ -260,7 +286,8 @@ class OCRConfigWindow(tk.Tk):
         return os.path.join(os.path.dirname(pdf_path), json_file)
 
     def start_pdf_viewer(self, pdf_path, json_path):
-        
+        from data.core.main_gui import PDFViewer
+
         self.destroy()
         PDFViewer(json_path, pdf_path).mainloop()
 
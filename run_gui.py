@@ -1,11 +1,11 @@
+import time
+_START_TIME = time.perf_counter()
+
 import tkinter as tk
 from tkinter import filedialog, messagebox
 import logging
 import os
 import json
-import fitz  
-
-from data.core.main_gui import PDFViewer  
 
 class StartGUIApp(tk.Tk):
     def __init__(self):
@@ -25,6 +25,11 @@ class StartGUIApp(tk.Tk):
         self.pdf_path = None
         self.json_path = None
 
+        self.after_idle(self.report_startup_time)
+
+    def report_startup_time(self):
+        print(f"Startup finished in {time.perf_counter() - _START_TIME:.3f} s")
+
     def load_files(self):
         
         pdf_file_path = filedialog.askopenfilename(title="Select PDF File", filetypes=[("PDF files", "*.pdf")])
@@ -54,6 +59,8 @@ class StartGUIApp(tk.Tk):
         self.start_pdf_viewer(self.pdf_path, self.json_path)
 
     def create_empty_json(self, pdf_path):
+        import fitz
+
         json_file = os.path.splitext(os.path.basename(pdf_path))[0] + ".json"
         json_path = os.path.join(os.path.dirname(pdf_path), json_file)
         
@@ -77,7 +84,8 @@ class StartGUIApp(tk.Tk):
         return json_path
 
     def start_pdf_viewer(self, pdf_path, json_path):
-        
+        from data.core.main_gui import PDFViewer
+
         self.destroy()
         PDFViewer(json_path, pdf_path).mainloop()
 
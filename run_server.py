@@ -0,0 +1,34 @@
+import argparse
+import logging
+
+from data.core.parsing_utils.engines import ENGINES
+from data.core.parsing_utils.inference_server import DEFAULT_HOST, DEFAULT_PORT, serve
+
+
+def parse_preload(value):
+    engine, _, language = value.partition(":")
+    if engine not in ENGINES:
+        raise argparse.ArgumentTypeError(f"Unknown OCR engine: {engine}")
+    return engine, language or None
+
+
+def main(argv=None):
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Keep the layout, OCR and captioning models loaded for run.py and convert.py.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--preload", type=parse_preload, action="append", default=[], metavar="ENGINE[:LANGUAGE]",
+                        help="load an OCR engine at start-up, e.g. Tesseract:ces (may be repeated)")
+    parser.add_argument("--captioning", action="store_true", help="load the captioning model at start-up")
+    parser.add_argument("--max-batch", type=int, default=32, help="largest number of items run in one model call")
+    parser.add_argument("--max-wait", type=float, default=0.02, help="seconds to wait for other requests to join a batch")
+    parser.add_argument("--workers", type=int, default=1, help="Tesseract: number of worker processes each batch is spread over")
+    args = parser.parse_args(argv)
+
+    engine_options = {'Tesseract': {'workers': args.workers}} if args.workers > 1 else {}
+    serve(args.host, args.port, preload=args.preload, captioning=args.captioning, max_batch=args.max_batch, max_wait=args.max_wait,
+          engine_options=engine_options)
+
+
+if __name__ == '__main__':
+    main()